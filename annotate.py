@@ -0,0 +1,98 @@
+# annotate.py
+# Find the mistakes in recorded games of Hand of the King (see the --record option in hotk.py). Each game is
+# replayed with the rules in hotk.py, and every position in it is searched by a pool of worker processes to
+# find the value of every move that was available (using the search in players/amelia.py, to the given
+# depth, or to the end of the game once few enough cards are left). Each move that was played is then
+# labelled with the value it lost: the value of the best move minus the value of the move that was played
+# (0 if it was one of the best moves).
+#
+# Values are on amelia's scale: the heuristic (e.g. +10 for each house secured) or +/-WIN if the outcome is
+# already decided, so a move that throws away a won game loses at least WIN. Near the end of a game, every
+# move is searched to the end, so its value is exactly +/-WIN (a move that is only worse on the heuristic
+# loses nothing, as long as it still wins). A value found by a depth-limited search may miss a win that is
+# just beyond the depth limit, so deeper searches give fewer false blunders. A move is a blunder if it
+# loses at least the given threshold. The report gives the blunder rate and the mean value lost by each
+# player (by seat, unless names are given), and the positions with the worst moves.
+
+import argparse
+from copy import deepcopy
+import hotk
+import json
+import math
+import multiprocessing
+from players import amelia
+
+parser = argparse.ArgumentParser(description="Label the moves in recorded games of Game of Thrones: Hand of the King with the value they lost.")
+parser.add_argument('games', nargs='+', metavar='file', type=str, help="files containing recorded games")
+parser.add_argument('-p', '--players', nargs=2, metavar='name', type=str, help="names of the players in the recorded games (in seat order)", default=['Player 1', 'Player 2'])
+parser.add_argument('-d', '--depth', metavar='n', type=int, help="depth limit of the search at each position", default=amelia.DLSmax)
+parser.add_argument('-e', '--exact', metavar='n', type=int, help="search to the end of the game once at most n cards are left on the board", default=14)
+parser.add_argument('-t', '--threshold', metavar='n', type=float, help="value lost by a move for it to be a blunder", default=10)
+parser.add_argument('-k', '--worst', metavar='n', type=int, help="number of worst moves to show", default=10)
+parser.add_argument('-w', '--workers', metavar='n', type=int, help="number of worker processes", default=multiprocessing.cpu_count())
+parser.add_argument('-o', '--output', metavar='file', type=str, help="file in which to save every labelled move (as JSON lines)", default=None)
+
+
+def main(args):
+    # Replay the games, collecting every position in which a move was played
+    positions = []
+    for file in args.games:
+        board, moves = hotk.loadgame(file)
+        state = hotk.newgame(board)
+        for i in range(len(moves)):
+            left = sum(card > 1 for card in state['board'])  # cards left, which is more than the number of moves left
+            depth = max(args.depth, left) if left <= args.exact else args.depth
+            positions.append((file, i, deepcopy(state), i % 2, moves[i], depth))  # players alternate turns
+            hotk.makemove(state, i % 2, moves[i])
+            state['moves'] += 1
+
+    # Search the positions in parallel (in order, so that each worker can reuse its results for the next move)
+    annotations = []
+    with multiprocessing.Pool(args.workers) as pool:
+        for annotation in pool.imap(annotate, positions, chunksize=8):
+            annotations.append(annotation)
+    if args.output:
+        with open(args.output, 'w') as f:
+            for annotation in annotations:
+                f.write(json.dumps(annotation) + '\n')
+
+    # Report the mistakes made by each player
+    for player in range(2):
+        labelled = [annotation for annotation in annotations if annotation['player'] == player]
+        if labelled:
+            blunders = sum(annotation['lost'] >= args.threshold for annotation in labelled)
+            print(f"{args.players[player]}: {len(labelled)} moves, {blunders} blunders ({blunders / len(labelled):.1%}), "
+                  f"mean value lost {sum(annotation['lost'] for annotation in labelled) / len(labelled):.2f}")
+    print("Worst moves:")
+    for annotation in sorted(annotations, key=lambda annotation: -annotation['lost'])[:args.worst]:
+        if annotation['lost'] > 0:
+            print(f"  {annotation['game']}, move {annotation['move'] + 1} ({args.players[annotation['player']]}): "
+                  f"played {annotation['played']} (value {annotation['value']:g}) instead of {annotation['best']} "
+                  f"(value {annotation['bestvalue']:g}), lost {annotation['lost']:g}")
+
+
+def annotate(position):
+    '''Search every move in a position (an item collected by main), returning the labelled move that was
+    played.'''
+    game, move, state, player, played, depth = position
+
+    amelia.forget(state)
+
+    # Find the value of every move, with a full window so that the values are exact (to this depth)
+    evaluation = amelia.Evaluation(state)
+    values = {card: amelia.minval(state, evaluation, player, card, -math.inf, math.inf, depth) for card in hotk.getvalidmoves(state)}
+    best = max(values, key=values.get)
+
+    return {
+        'game': game,
+        'move': move,
+        'player': player,
+        'played': played,
+        'value': values[played],
+        'best': best,
+        'bestvalue': values[best],
+        'lost': values[best] - values[played]}
+
+
+if __name__ == "__main__":
+    main(parser.parse_args())
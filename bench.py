@@ -0,0 +1,123 @@
+# bench.py
+# Measure how the strength of players/amelia.py scales with the depth limit of its search (DLSmax), and
+# what each extra ply costs. For each depth in the sweep, amelia plays pairs of games (on the same board,
+# with seats swapped) against each baseline, and every one of its moves is measured: positions searched
+# (amelia.nodes), wall time, the size of the transposition table afterwards, and the peak memory allocated
+# by the search. The results are printed as a table, and can also be saved as CSV.
+#
+# Memory is measured with tracemalloc, which makes a search several times slower. So that the times are
+# not affected, each search is timed as usual, and then run again from a copy of the table as it was
+# before the move, while tracing memory. This makes the benchmark take a few times longer, unless memory is
+# not measured (--nomemory).
+#
+# A baseline is either an AI player file (e.g. players/randy.py) or a number, which means amelia itself
+# searching to that fixed depth. The opening book is not used, since it would hide the cost of searching.
+
+import argparse
+import csv
+import hotk
+from match import playmatch
+import os
+from players import amelia
+import time
+import tracemalloc
+
+parser = argparse.ArgumentParser(description="Measure the strength and cost of players/amelia.py at different search depths.")
+parser.add_argument('-d', '--depths', nargs='+', metavar='n', type=int, help="depth limits to measure", default=[1, 2, 3, 4, 5])
+parser.add_argument('-b', '--baselines', nargs='+', metavar='name', type=str, help="AI player files (or fixed depths for amelia) to play against", default=['players/randy.py', '3'])
+parser.add_argument('-n', '--pairs', metavar='n', type=int, help="number of pairs of games against each baseline", default=20)
+parser.add_argument('-s', '--seed', metavar='n', type=int, help="master seed for random number generator (every depth plays the same deals)", default=0)
+parser.add_argument('--nomemory', action="store_true", help="flag to skip measuring the memory allocated by each search (which takes longer than the search itself)")
+parser.add_argument('-o', '--output', metavar='file', type=str, help="file in which to save the table (as CSV)", default=None)
+
+
+class Searcher:
+    '''An AI player that uses amelia with its own depth limit (and its own transposition table), keeping
+    track of the cost of each move.'''
+
+    def __init__(self, depth, memory=False):
+        self.depth = depth
+        self.memory = memory  # whether to measure the memory allocated by each search
+        self.table = {}  # results depend on the depth, so they cannot be shared with another player
+        self.moves = 0
+        self.nodes = 0
+        self.seconds = 0
+        self.entries = 0  # total size of the transposition table after each move
+        self.peaks = []  # peak memory allocated by each search, in bytes
+
+    def get_computer_move(self, state, whichplayer):
+        amelia.DLSmax = self.depth
+        before = dict(self.table) if self.memory else None
+        amelia.table = self.table
+        nodes = amelia.nodes
+        began = time.perf_counter()
+        move = amelia.search(state, whichplayer)
+        self.seconds += time.perf_counter() - began
+        self.nodes += amelia.nodes - nodes
+        self.moves += 1
+        self.entries += len(self.table)
+
+        # Search again from the same table while tracing memory, so that tracing does not affect the time
+        if self.memory:
+            amelia.table = before
+            tracemalloc.start()
+            amelia.search(state, whichplayer)
+            self.peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            amelia.table = self.table
+
+        return move
+
+
+def main(args):
+    # Load the baselines
+    baselines = []
+    for baseline in args.baselines:
+        if baseline.isdigit():
+            baselines.append({'name': f'amelia{baseline}', 'module': Searcher(int(baseline))})
+        else:
+            name = os.path.splitext(os.path.basename(baseline))[0]
+            baselines.append({'name': name, 'module': hotk.loadplayers([baseline, baseline])[0]['module']})
+
+    # Measure each depth against every baseline
+    rows = []
+    for depth in args.depths:
+        searcher = Searcher(depth, not args.nomemory)
+        row = {'depth': depth}
+        for baseline in baselines:
+            ai = [{'name': f'amelia{depth}', 'module': searcher}, baseline]
+            wins = games = 0
+            for i, won, lost in playmatch(ai, None, args.seed, range(args.pairs), paired=True):
+                wins += won
+                games += won + lost
+            row[f"vs {baseline['name']}"] = wins / games
+        row['nodes/move'] = searcher.nodes / searcher.moves
+        row['ms/move'] = 1000 * searcher.seconds / searcher.moves
+        row['nodes/s'] = searcher.nodes / searcher.seconds if searcher.seconds else 0
+        row['entries/move'] = searcher.entries / searcher.moves
+        if searcher.peaks:
+            row['KB/move'] = sum(searcher.peaks) / len(searcher.peaks) / 2 ** 10
+            row['max KB/move'] = max(searcher.peaks) / 2 ** 10
+        rows.append(row)
+        print(describe(row) if len(rows) > 1 else describe(row, header=True), flush=True)
+
+    # Save the table, if desired
+    if args.output:
+        with open(args.output, 'w', newline='') as f:
+            writer = csv.DictWriter(f, list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+def describe(row, header=False):
+    '''Returns a row of the table as a string (after the names of the columns, if desired).'''
+    cells = [f'{value:>14.3f}' if isinstance(value, float) else f'{value:>14}' for value in row.values()]
+    line = ''.join(cells)
+    if header:
+        line = ''.join(f'{name:>14}' for name in row) + '\n' + line
+
+    return line
+
+
+if __name__ == "__main__":
+    main(parser.parse_args())
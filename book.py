@@ -0,0 +1,178 @@
+# book.py
+# An opening book for Hand of the King: the best move in every position of the first few plies of some
+# deals, found offline by deep searches, so that search players can answer opening moves without
+# searching. Running this file builds (or adds to) a book, e.g. for the first 2 plies of two deals:
+#   $ python book.py -b board0.txt board1.txt --plies 2 --depth 9
+#
+# Positions are stored by a hash of their canonical version (see symmetry.py) and the player to move, so
+# a book also covers every rotation and reflection of its deals. The book file starts with MAGIC, followed
+# by one record per position, sorted by hash: the hash (8 bytes, big-endian) and the move in the canonical
+# board (1 byte). A Book only opens the file the first time it is probed, and then finds positions by
+# binary search in a read-only memory map, so even a large book costs nothing until it is used.
+
+import argparse
+from copy import deepcopy
+import hashlib
+import hotk
+import importlib
+import mmap
+import multiprocessing
+import os
+import random
+import struct
+from symmetry import getcanonicalkey, tocanonical, tooriginal
+import sys
+
+MAGIC = b'HOTKBOOK'  # start of every book file
+RECORD = struct.Struct('>QB')  # hash and move of each position
+BOOKFILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'book.bin')  # default book
+
+amelia = None  # search player, loaded in each worker process (see loadworker)
+
+parser = argparse.ArgumentParser(description="Build an opening book for Game of Thrones: Hand of the King.")
+parser.add_argument('-b', '--boards', nargs='+', metavar='file', type=str, help="files containing the deals to include", default=[])
+parser.add_argument('-s', '--seeds', nargs='+', metavar='n', type=int, help="seeds of (randomly dealt) deals to include", default=[])
+parser.add_argument('-n', '--plies', metavar='n', type=int, help="number of plies (moves by either player) to include from the start of each deal", default=2)
+parser.add_argument('-d', '--depth', metavar='n', type=int, help="depth limit of the searches (by players/amelia.py)", default=9)
+parser.add_argument('-w', '--workers', metavar='n', type=int, help="number of worker processes", default=multiprocessing.cpu_count())
+parser.add_argument('-o', '--output', metavar='file', type=str, help="book file to build (or add to)", default=BOOKFILE)
+
+
+class Book:
+    '''A read-only opening book, which is opened the first time it is probed.'''
+
+    def __init__(self, file=BOOKFILE):
+        self.file = file
+        self.records = None  # memory map of the records (empty if there is no book)
+
+    def probe(self, state, whichplayer):
+        '''Returns the move for whichplayer in this state from the book, or None if it is not there.'''
+        if self.records is None:
+            self.records = openbook(self.file)
+        if not self.records:
+            return None
+
+        # Find the position by binary search
+        key, t = getcanonicalkey(state)
+        target = gethash(key, whichplayer)
+        low, high = 0, len(self.records) // RECORD.size
+        while low < high:
+            middle = (low + high) // 2
+            position, move = RECORD.unpack_from(self.records, middle * RECORD.size)
+            if position < target:
+                low = middle + 1
+            elif position > target:
+                high = middle
+            else:
+                return tooriginal(move, t)
+
+        return None
+
+
+def main(args):
+    # Collect every position in the first plies of the deals (the opening), without repeats
+    boards = [hotk.loadcards(file) for file in args.boards]
+    for seed in args.seeds:
+        random.seed(seed)
+        boards.append(hotk.dealcards(hotk.HOUSES))
+    if not boards:
+        sys.exit('  ERROR: in main, no deals given (use --boards and/or --seeds)')
+    book = loadbook(args.output)
+    positions = getopening(boards, args.plies)
+    positions = {key: position for key, position in positions.items() if key not in book}
+    print(f"Searching {len(positions)} positions to depth {args.depth} ({len(book)} already in the book)")
+
+    # Search the positions in parallel, saving the best move in each one (in canonical coordinates)
+    with multiprocessing.Pool(args.workers, initializer=loadworker, initargs=(args.depth,)) as pool:
+        for i, (key, move) in enumerate(pool.imap_unordered(searchposition, positions.items())):
+            book[key] = move
+            if (i + 1) % 100 == 0:
+                print(f"Searched {i + 1} of {len(positions)} positions")
+    savebook(args.output, book)
+    print(f"Saved {len(book)} positions to {args.output}")
+
+
+def gethash(key, whichplayer):
+    '''Returns the hash (as an 8-byte integer) of a canonical position (see symmetry.getcanonicalkey) with
+    whichplayer to move.'''
+    data = bytes([value for part in key for value in part] + [whichplayer])
+
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+
+def getopening(boards, plies):
+    '''Returns every position (state and player to move) in the first plies of games on the given boards,
+    keyed by hash.'''
+    positions = {}
+    frontier = [hotk.newgame(board.copy()) for board in boards]
+    for ply in range(plies):
+        player = ply % 2  # players alternate turns, starting with player 1
+        following = []
+        for state in frontier:
+            key = gethash(getcanonicalkey(state)[0], player)
+            if key in positions:  # already reached by another sequence of moves (or by symmetry)
+                continue
+            moves = hotk.getvalidmoves(state)
+            if len(moves) == 0:
+                continue
+            positions[key] = (state, player)
+            for move in moves:
+                after = deepcopy(state)
+                hotk.makemove(after, player, move)
+                after['moves'] += 1
+                following.append(after)
+        frontier = following
+
+    return positions
+
+
+def loadbook(file):
+    '''Returns the positions in a book file, as a dictionary mapping hash to move (empty if there is no
+    book).'''
+    records = openbook(file)
+
+    return dict(RECORD.iter_unpack(records)) if records else {}
+
+
+def loadworker(depth):
+    '''Load the search player in a worker process, and set the depth limit of its search. (It is not
+    imported along with this module because it uses the book itself.)'''
+    global amelia
+    amelia = importlib.import_module('players.amelia')
+    amelia.DLSmax = depth
+    amelia.BOOK = False  # search every position, rather than using the book being built
+
+
+def openbook(file):
+    '''Returns a read-only memory map of the records in a book file, or an empty bytes object if there is
+    no book.'''
+    if not os.path.exists(file) or os.path.getsize(file) <= len(MAGIC):
+        return b''
+    with open(file, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            sys.exit(f'  ERROR: in openbook, not a book file ({file})')
+        records = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    return memoryview(records)[len(MAGIC):]
+
+
+def savebook(file, book):
+    '''Save a book (a dictionary mapping hash to move) to a file, replacing the file in one step (see
+    hotk.replacefile).'''
+    with hotk.replacefile(file, 'wb') as f:
+        f.write(MAGIC)
+        for key in sorted(book):
+            f.write(RECORD.pack(key, book[key]))
+
+
+def searchposition(item):
+    '''Search a position (an item from getopening), returning its hash and best move (in canonical
+    coordinates).'''
+    key, (state, player) = item
+    move = amelia.search(state, player)
+
+    return key, tocanonical(move, getcanonicalkey(state)[1])
+
+
+if __name__ == "__main__":
+    main(parser.parse_args())
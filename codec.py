@@ -0,0 +1,117 @@
+# codec.py
+# Compact encodings of deals and positions of Hand of the King.
+#
+# A deal (a board from hotk.dealcards) is an arrangement of a fixed multiset of cards, so every deal can be
+# numbered by its rank among all DEALS possible arrangements, in lexicographic order. rankdeal and
+# unrankdeal convert between the two, so a deal can be stored or referred to as a single integer (under
+# 2^86), and a uniformly random deal is just a uniformly random rank (see sampledeal).
+#
+# A position in the middle of a game (board, cards and banners, as in hotk.getkey) is encoded in a fixed
+# number of bytes (SIZE), with one 4-bit digit for each position of the board, for the cards of each house
+# captured by each player, and for the owner of each banner (0 for neither, or 1 + player).
+#
+# Running this file prints the rank of the deal in a board file, or (with --unrank) the deal with a given
+# rank, in the format of a board file.
+
+import argparse
+from hotk import COLS, HOUSES, ROWS, loadcards, newgame
+import math
+import random
+import sys
+
+COUNTS = [0, 1] + HOUSES  # number of cards of each value (1 for Varys, then the size of each house)
+DEALS = math.factorial(sum(COUNTS)) // math.prod(math.factorial(count) for count in COUNTS)  # number of deals
+SIZE = (ROWS * COLS + 3 * len(HOUSES) + 1) // 2  # bytes in an encoded position
+
+parser = argparse.ArgumentParser(description="Convert between deals of Game of Thrones: Hand of the King and their ranks.")
+parser.add_argument('board', metavar='file', type=str, nargs='?', help="file containing a board setup, whose rank is printed", default=None)
+parser.add_argument('-u', '--unrank', metavar='n', type=int, help="print the deal with this rank instead", default=None)
+
+
+def main(args):
+    if args.unrank is not None:
+        board = unrankdeal(args.unrank)
+        for row in range(ROWS):
+            print(' '.join(str(card) for card in board[row * COLS:(row + 1) * COLS]))
+    elif args.board:
+        print(rankdeal(loadcards(args.board)))
+    else:
+        parser.print_usage()
+
+
+def decode(data):
+    '''Returns the game state of an encoded position (see encode). The number of moves is not encoded, so it
+    is 0 in the state.'''
+    digits = list(map(int, data.hex()))  # every digit is at most 8
+    board = digits[:ROWS * COLS]
+    digits = digits[ROWS * COLS:]
+    state = newgame(board)
+    state['cards'] = [digits[:len(HOUSES)], digits[len(HOUSES):2 * len(HOUSES)]]
+    owners = digits[2 * len(HOUSES):3 * len(HOUSES)]
+    state['banners'] = [[int(owner == 1) for owner in owners], [int(owner == 2) for owner in owners]]
+
+    return state
+
+
+def encode(state):
+    '''Returns a position (board, cards and banners) as SIZE bytes.'''
+    banners = state['banners']
+    owners = [1 if banners[0][i] else 2 if banners[1][i] else 0 for i in range(len(HOUSES))]
+    digits = state['board'] + state['cards'][0] + state['cards'][1] + owners
+    if len(digits) % 2:
+        digits = digits + [0]  # pad to a whole number of bytes
+
+    return bytes.fromhex(''.join(map(str, digits)))  # every digit is at most 8
+
+
+def rankdeal(board):
+    '''Returns the rank of a deal: the number of deals that come before it in lexicographic order.'''
+    counts = COUNTS.copy()
+    if sorted(board) != [card for card in range(len(COUNTS)) for i in range(COUNTS[card])]:
+        sys.exit('  ERROR: in rankdeal, invalid board because it does not contain the cards of a deal')
+
+    # For each position, count the deals with the same cards before it and a smaller card in it
+    rank = 0
+    remaining = len(board)
+    arrangements = DEALS  # number of arrangements of the remaining cards
+    for card in board:
+        for smaller in range(1, card):
+            rank += arrangements * counts[smaller] // remaining
+        arrangements = arrangements * counts[card] // remaining
+        counts[card] -= 1
+        remaining -= 1
+
+    return rank
+
+
+def sampledeal(generator=random):
+    '''Returns a deal chosen uniformly at random (using the given random number generator).'''
+    return unrankdeal(generator.randrange(DEALS))
+
+
+def unrankdeal(rank):
+    '''Returns the deal with the given rank (see rankdeal).'''
+    if not 0 <= rank < DEALS:
+        sys.exit(f'  ERROR: in unrankdeal, invalid rank because it is not between 0 and {DEALS - 1}')
+    counts = COUNTS.copy()
+
+    # For each position, find the card whose block of deals contains the rank
+    board = []
+    remaining = sum(counts)
+    arrangements = DEALS
+    for position in range(sum(COUNTS)):
+        for card in range(1, len(counts)):
+            block = arrangements * counts[card] // remaining  # deals with this card in this position
+            if rank < block:
+                break
+            rank -= block
+        board.append(card)
+        arrangements = block
+        counts[card] -= 1
+        remaining -= 1
+
+    return board
+
+
+if __name__ == "__main__":
+    main(parser.parse_args())
@@ -0,0 +1,184 @@
+# dashboard.py
+# A live dashboard for watching many AI-only games of Hand of the King at the same time. The games
+# are played by worker processes using the rules in hotk.py, and each board is drawn as a small tile
+# on a single graphics window. Redraws are throttled to a fixed frame rate, and only the cards that
+# changed since the last frame are recolored, so that dozens of live boards stay responsive.
+
+import argparse
+from copy import deepcopy
+from graphics import *
+from hand_of_the_king import loadcolors
+import hotk
+import math
+import multiprocessing
+import queue
+import random
+import sys
+import time
+
+CELL_SIZE = 10  # height and width of cards in each tile, in pixels
+TILE_MARGIN = 8  # space in between tiles, in pixels
+LABEL_SIZE = 14  # space below each tile for the score, in pixels
+BACKGROUND = 'white'  # color of the window (and of empty spaces on each board)
+
+parser = argparse.ArgumentParser(description="Watch many AI-only games of Hand of the King at once!")
+parser.add_argument('-p', '--players', nargs=2, metavar='name', type=str, help="specify two AI players by filename", default=['players/randy.py', 'players/randy.py'])
+parser.add_argument('-n', '--games', metavar='n', type=int, help="number of games to play", default=64)
+parser.add_argument('-w', '--workers', metavar='n', type=int, help="number of worker processes", default=multiprocessing.cpu_count())
+parser.add_argument('-b', '--board', metavar='file', type=str, help="file containing starting board setup (for all games)", default=None)
+parser.add_argument('-s', '--seed', metavar='n', type=int, help="seed for random number generator", default=None)
+parser.add_argument('-f', '--fps', metavar='n', type=float, help="maximum number of redraws per second", default=10)
+parser.add_argument('--delay', metavar='t', type=float, help="time (in seconds) each worker waits between rounds of moves", default=0)
+
+
+def main(args):
+    # Start the workers, dividing the games between them as evenly as possible
+    updates = multiprocessing.Queue()
+    workers = []
+    for i in range(min(args.workers, args.games)):
+        seed = None if args.seed is None else args.seed + i  # each worker gets its own random stream
+        games = list(range(i, args.games, args.workers))
+        worker = multiprocessing.Process(target=rungames, args=(games, args.players, args.board, seed, args.delay, updates), daemon=True)
+        worker.start()
+        workers.append(worker)
+
+    # Make the dashboard
+    gui, tiles, labels = dashboardsetup(args.games)
+    status = gui.items[-1]
+    drawn = [[None] * (hotk.ROWS * hotk.COLS) for i in range(args.games)]  # boards as currently displayed
+    colors = loadcolors()
+    finished = 0
+
+    # Redraw the dashboard until the user quits
+    while not gui.isClosed():
+        # Keep only the most recent update from each game since the last frame
+        latest = {}
+        try:
+            while True:
+                game, board, score, done = updates.get_nowait()
+                latest[game] = (board, score)
+                finished += done
+        except queue.Empty:
+            pass
+
+        # Recolor the cards that changed
+        for game, (board, score) in latest.items():
+            redraw(tiles[game], drawn[game], board, colors)
+            labels[game].setText(score)
+        if latest:
+            status.setText(f"{finished} of {args.games} games finished")
+
+        # Show the new frame, waiting if needed to stay within the frame rate
+        update(args.fps)
+
+        # Check for keyboard input
+        key = gui.checkKey()
+        if key == "Escape" or key == "Ctrl+e":  # exit dashboard
+            break
+
+    # Stop any games that are still running
+    for worker in workers:
+        worker.terminate()
+    gui.close()
+
+
+def dashboardsetup(n):
+    '''Create a window with one (initially blank) tile per game, arranged in a grid.'''
+    # Determine the size of the grid of tiles
+    across = max(1, math.ceil(math.sqrt(n)))
+    down = math.ceil(n / across)
+    tilewid = hotk.COLS * CELL_SIZE + TILE_MARGIN
+    tilehei = hotk.ROWS * CELL_SIZE + TILE_MARGIN + LABEL_SIZE
+
+    # Make dashboard window (without redrawing every time an object changes)
+    wid = across * tilewid + TILE_MARGIN
+    hei = down * tilehei + TILE_MARGIN + 30
+    gui = GraphWin("A Game of Thrones: Hand of the King (Dashboard)", wid, hei, autoflush=False)
+    gui.setBackground(BACKGROUND)
+
+    # Create card graphics for each tile
+    tiles = []
+    labels = []
+    for k in range(n):
+        x0 = TILE_MARGIN + (k % across) * tilewid
+        y0 = TILE_MARGIN + (k // across) * tilehei
+        cells = []
+        for row in range(hotk.ROWS):
+            for col in range(hotk.COLS):
+                x1 = x0 + CELL_SIZE * col
+                y1 = y0 + CELL_SIZE * row
+                cell = Rectangle(Point(x1, y1), Point(x1 + CELL_SIZE, y1 + CELL_SIZE))
+                cell.setFill(BACKGROUND)
+                cell.setOutline(BACKGROUND)
+                cell.draw(gui)
+                cells.append(cell)
+        label = Text(Point(x0 + hotk.COLS * CELL_SIZE // 2, y0 + hotk.ROWS * CELL_SIZE + LABEL_SIZE // 2 + 1), "")
+        label.setSize(8)
+        label.draw(gui)
+        tiles.append(cells)
+        labels.append(label)
+
+    # Add text message at bottom
+    txt = Text(Point(wid // 2, hei - 20), f"0 of {n} games finished")
+    txt.setSize(12)
+    txt.draw(gui)
+    update()
+
+    return gui, tiles, labels
+
+
+def redraw(cells, drawn, board, colors):
+    '''Recolor the cells of a tile whose cards differ from the board currently drawn.'''
+    for i in range(len(board)):
+        if board[i] != drawn[i]:
+            if board[i] == 0:  # there is no card in this position anymore
+                cells[i].setFill(BACKGROUND)
+                cells[i].setOutline(BACKGROUND)
+            else:
+                cells[i].setFill(colors[board[i] - 1][0])
+                cells[i].setOutline(colors[board[i] - 1][1])
+            drawn[i] = board[i]
+
+
+def rungames(games, players, board=None, seed=None, delay=0, updates=None):
+    '''Play several games side by side, one move per game in each round, sending the board of every
+    game to the dashboard after each move as a tuple of (game, board, score, done).'''
+    # Initialize the games
+    random.seed(seed)
+    ai = hotk.loadplayers(players)
+    states = {}
+    for game in games:
+        states[game] = hotk.newgame(hotk.loadcards(board) if board else hotk.dealcards(hotk.HOUSES))
+        updates.put((game, states[game]['board'].copy(), "0-0", False))
+
+    # Play a round of moves at a time until every game is over
+    while states:
+        for game in list(states):
+            state = states[game]
+            currentplayer = state['moves'] % 2
+            score = f"{sum(state['banners'][0])}-{sum(state['banners'][1])}"
+
+            # Is the game over?
+            validmoves = hotk.getvalidmoves(state)
+            if len(validmoves) == 0:
+                updates.put((game, state['board'].copy(), score, True))
+                del states[game]
+                continue
+
+            # Query player to select a card
+            whichcard = ai[currentplayer]['module'].get_computer_move(deepcopy(state), currentplayer)
+
+            # Make the move if it is valid
+            if whichcard in validmoves:
+                hotk.makemove(state, currentplayer, whichcard)
+                state['moves'] += 1
+                score = f"{sum(state['banners'][0])}-{sum(state['banners'][1])}"
+                updates.put((game, state['board'].copy(), score, False))
+            else:
+                sys.exit(f"  ERROR: in rungames, player {currentplayer} ({ai[currentplayer]['name']}) made an invalid move")
+
+        time.sleep(delay)
+
+
+if __name__ == "__main__":
+    main(parser.parse_args())
@@ -0,0 +1,170 @@
+# dataset.py
+# Generate a dataset of labelled positions (e.g. for training a learned evaluation) by playing many AI-only
+# games of Hand of the King in parallel, using the rules in hotk.py. Every position in which a player has
+# to move is saved with the side to move, the moves that are legal, and the final outcome of the game for
+# the side to move (1 for a win, -1 for a loss).
+#
+# Positions are stored in fixed-size shards of .npy files, which are created at full size and then filled
+# in place through memory maps, so the dataset never has to fit in memory. Each shard i has the files
+#   i-boards.npy   (n, 36) int8: card at each position of the board (0 for empty, 1 for Varys)
+#   i-cards.npy    (n, 2, 7) int8: number of cards of each house captured by each player
+#   i-banners.npy  (n, 2, 7) int8: banners held by each player
+#   i-player.npy   (n,) int8: side to move (0 or 1)
+#   i-legal.npy    (n, 36) bool: positions of the board that are legal moves
+#   i-outcome.npy  (n,) int8: 1 if the side to move goes on to win, -1 if it loses
+# and index.json gives the size of the shards and how many positions each one holds, since the last
+# shard is usually not full. Running the generator again on the same directory adds to the dataset.
+#
+# With --dedup, a position (including the side to move) that is already in the dataset is skipped, so
+# only the outcome of its first occurrence is kept. Positions are compared by a hash of their contents.
+
+import argparse
+from copy import deepcopy
+import hashlib
+import hotk
+import json
+from match import gameseed
+import multiprocessing
+import os
+import random
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    sys.exit('  ERROR: dataset.py requires numpy')
+
+FIELDS = {  # shape (of each position) and type of each array in a shard
+    'boards': ((hotk.ROWS * hotk.COLS,), np.int8),
+    'cards': ((2, len(hotk.HOUSES)), np.int8),
+    'banners': ((2, len(hotk.HOUSES)), np.int8),
+    'player': ((), np.int8),
+    'legal': ((hotk.ROWS * hotk.COLS,), np.bool_),
+    'outcome': ((), np.int8)}
+
+parser = argparse.ArgumentParser(description="Generate a dataset of positions from games of Game of Thrones: Hand of the King.")
+parser.add_argument('directory', metavar='directory', type=str, help="directory in which to save (or add to) the dataset")
+parser.add_argument('-p', '--players', nargs=2, metavar='name', type=str, help="specify two AI players by filename", default=['players/randy.py', 'players/randy.py'])
+parser.add_argument('-n', '--games', metavar='n', type=int, help="number of games to play", default=1000)
+parser.add_argument('-w', '--workers', metavar='n', type=int, help="number of worker processes", default=multiprocessing.cpu_count())
+parser.add_argument('-s', '--seed', metavar='n', type=int, help="master seed for random number generator (each game gets its own seed from it)", default=None)
+parser.add_argument('--size', metavar='n', type=int, help="number of positions in each shard (of a new dataset)", default=100000)
+parser.add_argument('--dedup', action="store_true", help="flag to skip positions that are already in the dataset")
+
+ai = None  # players loaded in each worker process (see loadworker)
+
+
+def main(args):
+    # Open the dataset (making it, if needed), and hash its positions, if duplicates are to be skipped
+    index = loadindex(args.directory, args.size)
+    seen = set()
+    if args.dedup:
+        for i in range(len(index['shards'])):
+            arrays = openshard(args.directory, i, index['size'])
+            seen.update(gethash(*[arrays[field][j] for field in ['boards', 'cards', 'banners', 'player']]) for j in range(index['shards'][i]))
+
+    # Play the games in parallel, adding their positions to the dataset as each game finishes
+    shard = len(index['shards']) - 1
+    arrays = openshard(args.directory, shard, index['size'])
+    added = skipped = 0
+    with multiprocessing.Pool(args.workers, initializer=loadworker, initargs=(args.players,)) as pool:
+        for game, positions in enumerate(pool.imap_unordered(playgame, [gameseed(args.seed, i) for i in range(args.games)], chunksize=16)):
+            for position in positions:
+                if args.dedup:
+                    key = gethash(*position[:4])
+                    if key in seen:
+                        skipped += 1
+                        continue
+                    seen.add(key)
+
+                # Start a new shard when the last one is full
+                if index['shards'][shard] == index['size']:
+                    flush(arrays)
+                    shard += 1
+                    index['shards'].append(0)
+                    arrays = openshard(args.directory, shard, index['size'])
+                for field, value in zip(FIELDS, position):
+                    arrays[field][index['shards'][shard]] = value
+                index['shards'][shard] += 1
+                added += 1
+
+            # Save progress every so often, so that an interrupted run keeps most of its positions
+            if (game + 1) % 100 == 0 or game + 1 == args.games:
+                flush(arrays)
+                saveindex(args.directory, index)
+                print(f"Games: {game + 1}, positions added: {added}" + (f", duplicates skipped: {skipped}" if args.dedup else ""))
+
+
+def flush(arrays):
+    '''Write any changes to the arrays of a shard to disk.'''
+    for array in arrays.values():
+        array.flush()
+
+
+def gethash(board, cards, banners, player):
+    '''Returns a hash of a position (as an integer), which is the same in every run.'''
+    data = b''.join(np.asarray(value, dtype=np.int8).tobytes() for value in [board, cards, banners, player])
+
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+
+def loadindex(directory, size):
+    '''Returns the index of the dataset in a directory, making a new (empty) dataset if there is none.'''
+    file = os.path.join(directory, 'index.json')
+    if not os.path.exists(file):
+        os.makedirs(directory, exist_ok=True)
+        index = {'size': size, 'shards': [0]}
+        saveindex(directory, index)
+    with open(file, 'r') as f:
+        return json.load(f)
+
+
+def loadworker(players):
+    '''Load the AI players in a worker process.'''
+    global ai
+    ai = hotk.loadplayers(players)
+
+
+def openshard(directory, shard, size):
+    '''Returns the arrays of a shard (as memory maps), creating the files at full size if needed.'''
+    arrays = {}
+    for field, (shape, dtype) in FIELDS.items():
+        file = os.path.join(directory, f'{shard:05d}-{field}.npy')
+        if os.path.exists(file):
+            arrays[field] = np.load(file, mmap_mode='r+')
+        else:
+            arrays[field] = np.lib.format.open_memmap(file, mode='w+', dtype=dtype, shape=(size,) + shape)
+
+    return arrays
+
+
+def playgame(seed):
+    '''Play a game from the given seed, returning every position in which a player moved (in the order of
+    FIELDS).'''
+    random.seed(seed)
+    board = hotk.dealcards(hotk.HOUSES)
+    final, history = hotk.playgame(ai, board.copy())
+    winner = hotk.getwinner(final)
+
+    # Replay the game, keeping each position along with its outcome for the side to move
+    state = hotk.newgame(board)
+    positions = []
+    for i in range(len(history)):
+        player = i % 2  # players alternate turns, starting with player 1
+        legal = np.zeros(len(board), dtype=np.bool_)
+        legal[hotk.getvalidmoves(state)] = True
+        positions.append((state['board'].copy(), deepcopy(state['cards']), deepcopy(state['banners']), player, legal, 1 if player == winner else -1))
+        hotk.makemove(state, player, history[i])
+        state['moves'] += 1
+
+    return positions
+
+
+def saveindex(directory, index):
+    '''Save the index of a dataset, replacing the file in one step (see hotk.replacefile).'''
+    with hotk.replacefile(os.path.join(directory, 'index.json')) as f:
+        json.dump(index, f)
+
+
+if __name__ == "__main__":
+    main(parser.parse_args())
@@ -6,6 +6,7 @@
 # more moves are available on the board is declared the winner.
 
 import argparse
+from copy import deepcopy
 from graphics import *
 import importlib
 import pdb
@@ -24,6 +25,7 @@ parser.add_argument('--player1', metavar='p1', type=str, help="either human or t
 parser.add_argument('--player2', metavar='p2', type=str, help="either human or the name of an AI file", default='human')
 parser.add_argument('-b', '--board', type=str, help="file containing starting board setup (for repeatability)", default=None)
 parser.add_argument('-s', '--seed', metavar='n', type=int, help="seed for random number generator", default=None)
+parser.add_argument('--ponder', action="store_true", help="flag to let AI players think on their opponent's time (if they can)")
 
 
 def main(args):
@@ -60,12 +62,15 @@ def main(args):
 
     # Play the game
     turn = 0
+    moves = 0
     gameover = False
     while True:
         # Is the game over?
         validmoves = getvalidmoves(board)
         if len(validmoves) == 0:
             # print(f'There are no remaining moves. Game over.')
+            if not gameover and args.ponder:  # there is nothing left to ponder, so stop
+                stoppondering(ai)
             gameover = True
             if sum(banners[0]) > sum(banners[1]):
                 winner = 'Player 1' if players[0] == 'human' or players[0] == players[1] else players[0]
@@ -93,7 +98,7 @@ def main(args):
             else:  # the player is an AI agent
                 status(gui, f'{players[turn]} is thinking...')
                 time.sleep(PAUSE)
-                ind = ai[turn].get_computer_move(board.copy(), cards.copy(), banners.copy(), turn)
+                ind = ai[turn].get_computer_move(getstate(board, cards, banners, moves), turn)
 
             # Make the move if it is valid
             if ind in validmoves:
@@ -109,6 +114,11 @@ def main(args):
                     banners[turn][color - 2] = 1  # add the banner to the player's collection
                     banners[abs(turn - 1)][color - 2] = 0
                 
+                # Let an AI player think while the opponent decides, if desired
+                moves += 1
+                if args.ponder and ai[turn] and hasattr(ai[turn], 'ponder'):
+                    ai[turn].ponder(getstate(board, cards, banners, moves), turn)
+
                 # Switch turns
                 turn = abs(turn - 1)
                 
@@ -128,16 +138,15 @@ def main(args):
         if key:
             # print(key)
             if key == "Escape" or key == "Ctrl+e":  # exit game
+                if args.ponder:
+                    stoppondering(ai)
                 break
 
 
 def gamesetup(board):
     '''Create the board user interface.'''
     # Read colors from file
-    colors = [0] * COLORS
-    with open('colors.txt', 'r') as f:
-        for i in range(COLORS):
-            colors[i] = f.readline().strip().split(',')
+    colors = loadcolors()
 
     # Make game window
     wid = COLS * CARD_SIZE + MARGIN * (COLS + 1)
@@ -168,6 +177,19 @@ def gamesetup(board):
     return gui
 
 
+def getstate(board, cards, banners, moves):
+    '''Returns a copy of the game state as a dictionary, which is how AI players expect to receive it.'''
+    state = {
+        'board': board.copy(),
+        'cards': deepcopy(cards),
+        'banners': deepcopy(banners),
+        'columns': COLS,
+        'rows': ROWS,
+        'moves': moves}
+
+    return state
+
+
 def getvalidmoves(board):
     '''Returns an array of available remaining moves based on current board.'''
     # Initialize list of moves
@@ -214,6 +236,16 @@ def getvalidmoves(board):
     return moves
 
 
+def loadcolors(txtfile='colors.txt'):
+    '''Returns the (fill, outline) colors of each card type, as listed in file.'''
+    colors = [0] * COLORS
+    with open(txtfile, 'r') as f:
+        for i in range(COLORS):
+            colors[i] = f.readline().strip().split(',')
+
+    return colors
+
+
 def loadcards(txtfile):
     '''Initialize the board by loading "pre-shuffled" cards from file.'''
     with open(txtfile, 'r') as f:
@@ -279,6 +311,13 @@ def shufflecards():
     return board
 
 
+def stoppondering(ai):
+    '''Stop any AI player that is thinking in the background (see hotk.playgame).'''
+    for i in range(2):
+        if ai[i] and hasattr(ai[i], 'stoppondering'):
+            ai[i].stoppondering(i)
+
+
 def status(gui, msg):
     '''Update the text status in the GUI.'''
     txt = gui.items[-1]
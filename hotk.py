@@ -6,15 +6,48 @@
 # when no more moves are available on the board is declared the winner.
 #
 # ***This is a non-graphics, AI-only version implemented for speed***
+#
+# Results can optionally be kept in a cache (a SQLite database), so that replaying an identical game
+# returns its result immediately. A game is identical if it has the same seed, board file and options,
+# and the same source code for both players, for this file and for every other module of this repository
+# that the players use, as well as the same data files that the players declare in DATA (e.g. the opening
+# book of players/amelia.py). Editing any of those files changes the key of its games, so old results are
+# never reused. This assumes that players are deterministic, apart from their use of the (seeded) random
+# module. Games with remote players are never cached, since their code is unknown. The cache also keeps
+# each game (its starting board, moves and record), so that a game found in the cache is still saved with
+# --record and appended to the results file with --output, as it was when it was played (including its
+# timings).
+#
+# To play many games without starting Python (and loading the players) for each one, run this file as a
+# server (--serve). Each game is requested as one line of JSON containing the arguments of play, e.g.
+#   {"id": 1, "players": ["players/randy.py", "players/minimax.py"], "seed": 5}
+# and the server answers with one line of JSON containing the result (or an error), and the id, if given:
+#   {"id": 1, "result": "minimax def randy 4-3"}
+# Requests are read from stdin (answered on stdout), or from TCP connections on localhost if a port is
+# given. Games are played one at a time, since players share the random module. A request cannot name
+# any file to write (a record, cache or results file), since any client could then overwrite any file;
+# instead, the --cache and --output given to the server apply to every game it plays.
+#
+# A structured record of each game (players, seed, final banners and cards, score, timings, ...) can be
+# appended to a results file (--output), as JSON lines or, if the file name ends in .csv, as CSV. Each
+# record is written (and flushed) as soon as its game is over, so the file can be followed while a long
+# run (e.g. with --serve) is still going.
 
 import argparse
+import contextlib
 from copy import deepcopy
+import csv
+import hashlib
 import importlib
+import json
 import os
 import pdb
 import random
+import socketserver
+import sqlite3
 import sys
 import time
+import types
 
 ROWS = 6
 COLS = 6
@@ -27,51 +60,55 @@ parser.add_argument('-s', '--seed', metavar='n', type=int, help="seed for random
 parser.add_argument('-r', '--randomize', action="store_true", help="flag to randomize player order")
 parser.add_argument('-v', '--verbose', action="store_true", help="flag to show helpful text")
 parser.add_argument('-d', '--debug', action="store_true", help="flag to use pdb when applicable")
+parser.add_argument('-a', '--adjudicate', action="store_true", help="flag to end the game as soon as the outcome is decided")
+parser.add_argument('--ponder', action="store_true", help="flag to let AI players think on their opponent's time (if they can)")
+parser.add_argument('--record', metavar='file', type=str, help="file in which to save the starting board and moves (for replays)", default=None)
+parser.add_argument('--cache', metavar='file', type=str, help="database of results of previous games (requires a seed)", default=None)
+parser.add_argument('-o', '--output', metavar='file', type=str, help="file to which a record of the game is appended (JSON lines, or CSV for .csv)", default=None)
+parser.add_argument('--serve', nargs='?', metavar='port', type=int, help="play games requested as JSON lines on stdin (or on a localhost port), with --cache and --output applying to every game", default=None, const=0)
+
+REQUEST = ['players', 'board', 'seed', 'randomize', 'adjudicate', 'ponder']  # arguments of play allowed in server requests
+RECORD = ['player1', 'player2', 'winner', 'seed', 'board', 'score1', 'score2', 'tiebreaker', 'moves',
+          'banners1', 'banners2', 'cards1', 'cards2', 'seconds', 'seconds1', 'seconds2']  # fields of each game record
 
 
-def play(players, board=None, seed=None, randomize=False, verbose=False, debug=False):
+def play(players, board=None, seed=None, randomize=False, verbose=False, debug=False, adjudicate=False, ponder=False, record=None, cache=None, output=None):
     # Initialize the game
     if verbose: print("Let's play a Game of Thrones: Hand of the King!")
     random.seed(seed)  # set seed for random number generator (for repeatability of shuffled cards, if desired)
     ai = loadplayers(players, randomize, verbose)
-    board = loadcards(board) if board else dealcards(HOUSES)
-    cards = [[0] * len(HOUSES) for i in range(2)]  # initialize card collection for each player
-    banners = [[0] * len(HOUSES) for i in range(2)]  # initialize banner collection for each player
 
-    # Store game state as dictionary
-    state = {
-        'board': board,
-        'cards': cards,
-        'banners': banners,
-        'columns': COLS,
-        'rows': ROWS,
-        'moves': 0}
+    # Return the result of an identical game, if one was already played (saving it as if it had just been
+    # played, if desired, unless it was cached before games were kept)
+    key = getcachekey(ai, board, seed, randomize, adjudicate, ponder) if cache else None
+    if key:
+        result = loadresult(cache, key)
+        game = loadcachedgame(cache, key) if record or output else None
+        if result and (game or not (record or output)):
+            if verbose: print(f"Found result in cache ({cache})")
+            if record: savegame(record, game['start'], game['moves'])
+            if output: saverecord(output, game['record'])
+            return result
+
+    boardfile = board
+    board = loadcards(board) if board else dealcards(HOUSES)
+    start = board.copy()  # keep the starting board, in case the game is recorded
 
     # Play the game
-    currentplayer = 0
-    while True:
-        # Show game info, if desired
-        if verbose: show(state, currentplayer)
-
-        # Is the game over?
-        validmoves = getvalidmoves(state)
-        if len(validmoves) == 0:
-            if verbose: print(f'There are no remaining moves. Game over.')
-            break
+    began = time.perf_counter()
+    timings = [0, 0]
+    state, history = playgame(ai, board, verbose, adjudicate, ponder, timings)
 
-        # Query player to select a card
-        whichcard = ai[currentplayer]['module'].get_computer_move(deepcopy(state), currentplayer)
+    # Save the game for replaying later, and a record of the game for analysis, if desired
+    game = {'start': start, 'moves': history, 'record': getrecord(state, ai, seed, boardfile, time.perf_counter() - began, timings)}
+    if record: savegame(record, start, history)
+    if output: saverecord(output, game['record'])
 
-        # Make the move if it is valid
-        if whichcard in validmoves:
-            makemove(state, currentplayer, whichcard)
-            currentplayer = abs(currentplayer - 1)  # switch turns
-            state['moves'] += 1
-        else:
-            sys.exit(f"  ERROR: in play, player {currentplayer} ({ai[currentplayer]['name']}) made an invalid move")
+    # Determine winner and return the game output (saving it for later, if desired)
+    result = whowins(state, ai)
+    if key: saveresult(cache, key, result, game)
 
-    # Determine winner and return the game output
-    return whowins(state, ai)
+    return result
 
 
 def dealcards(houses):
@@ -83,6 +120,118 @@ def dealcards(houses):
     return board
 
 
+def getbounds(state, player):
+    '''Returns the worst and best possible outcomes of the game for the given player (1 for a win, -1 for a
+    loss), based on the banners that are already locked (see getlocked). The outcome is decided if the
+    two are equal.'''
+    # The outcome cannot be decided unless one player already holds at least half of the banners
+    banners = state['banners']
+    if 2 * max(sum(banners[0]), sum(banners[1])) < len(HOUSES):
+        return -1, 1
+
+    locked = getlocked(state)
+    opponent = abs(player - 1)
+    ours = locked.count(player)
+    theirs = locked.count(opponent)
+    undecided = locked.count(None)
+    tiebreaker = locked[-1]  # the owner of the largest house wins a tie, if it is already known
+
+    # In the worst case, the opponent gets every undecided banner (and vice versa for the best case)
+    worst = 1 if ours > theirs + undecided or (ours == theirs + undecided and tiebreaker == player) else -1
+    best = -1 if theirs > ours + undecided or (theirs == ours + undecided and tiebreaker == opponent) else 1
+
+    return worst, best
+
+
+def getcachekey(ai, board, seed, *options):
+    '''Returns a key (a hash) that identifies a game between loaded AI players (see loadplayers) in the
+    cache, or None if the game cannot be repeated (i.e. there is no seed, or a player is remote, so its
+    code is unknown).'''
+    if seed is None or not all(isinstance(player['module'], types.ModuleType) for player in ai):
+        return None
+
+    # Combine the source code of the engine, the players and every module of this repository they use,
+    # and the data files the players read (see DATA in players/amelia.py), with everything else that
+    # affects the game
+    sha = hashlib.sha256()
+    for file in getsources([sys.modules[__name__]] + [player['module'] for player in ai]):
+        with open(file, 'rb') as f:
+            sha.update(hashlib.sha256(f.read()).digest())
+    for file in [file for player in ai for file in getattr(player['module'], 'DATA', [])]:
+        if os.path.exists(file):
+            with open(file, 'rb') as f:
+                sha.update(hashlib.sha256(f.read()).digest())
+        else:
+            sha.update(b'missing')  # e.g. no opening book, which is different from any book
+    if board:
+        try:
+            with open(board, 'rb') as f:
+                sha.update(hashlib.sha256(f.read()).digest())
+        except OSError:
+            return None  # let the game itself report the missing file
+    sha.update(json.dumps([[player['name'] for player in ai], bool(board), seed, options]).encode())
+
+    return sha.hexdigest()
+
+
+def getkey(state):
+    '''Returns a hashable representation of the position (board, cards and banners) in a game state.'''
+    return (tuple(state['board']),
+            tuple(state['cards'][0]), tuple(state['cards'][1]),
+            tuple(state['banners'][0]), tuple(state['banners'][1]))
+
+
+def getrecord(state, ai, seed=None, board=None, seconds=None, timings=None):
+    '''Returns a record of a finished game (see RECORD), with the players in seat order.'''
+    banners = state['banners']
+    cards = state['cards']
+    timings = timings or [None, None]
+
+    return {
+        'player1': ai[0]['name'],
+        'player2': ai[1]['name'],
+        'winner': ai[getwinner(state)]['name'],
+        'seed': seed,
+        'board': board,
+        'score1': sum(banners[0]),
+        'score2': sum(banners[1]),
+        'tiebreaker': sum(banners[0]) == sum(banners[1]),
+        'moves': state['moves'],
+        'banners1': banners[0],
+        'banners2': banners[1],
+        'cards1': cards[0],
+        'cards2': cards[1],
+        'seconds': seconds,
+        'seconds1': timings[0],
+        'seconds2': timings[1]}
+
+
+def getsources(modules):
+    '''Returns the source files (sorted) of the given modules and of every module of this repository that
+    they use, directly or not, i.e. the code that can affect their moves.'''
+    root = os.path.dirname(os.path.abspath(__file__))
+    files = set()
+    seen = set()
+    pending = list(modules)
+    while pending:
+        module = pending.pop()
+        file = getattr(module, '__file__', None)
+        if id(module) in seen or not file or not os.path.abspath(file).startswith(root + os.sep):
+            continue  # already seen, or not part of this repository (e.g. the standard library)
+        seen.add(id(module))
+        files.add(os.path.abspath(file))
+
+        # Follow imported modules, and the modules of imported functions, classes and objects
+        for value in vars(module).values():
+            name = getattr(value, '__module__', None)
+            if isinstance(value, types.ModuleType):
+                pending.append(value)
+            elif isinstance(name, str) and name in sys.modules:
+                pending.append(sys.modules[name])
+
+    return sorted(files, key=lambda file: os.path.relpath(file, root))
+
+
 def getvalidmoves(state):
     '''Returns an array of available remaining moves based on current state of game.'''
     # Unpack relevant info
@@ -134,6 +283,24 @@ def getvalidmoves(state):
     return moves
 
 
+def getlocked(state):
+    '''Returns the player (0 or 1) who will keep the banner of each house for the rest of the game, or None
+    for houses whose banner can still change hands.'''
+    # Unpack relevant info
+    cards = state['cards']
+    banners = state['banners']
+
+    locked = [None] * len(HOUSES)
+    for i in range(len(HOUSES)):
+        remaining = HOUSES[i] - cards[0][i] - cards[1][i]  # cards of this house not yet captured
+        for player in range(2):
+            # The banner is locked if its owner cannot be caught, even if the opponent captures the rest
+            if banners[player][i] and (remaining == 0 or cards[abs(player - 1)][i] + remaining < cards[player][i]):
+                locked[i] = player
+
+    return locked
+
+
 def loadcards(file):
     '''Initialize the board by loading "pre-shuffled" cards from a text file.'''
     with open(file, 'r') as f:
@@ -146,10 +313,43 @@ def loadcards(file):
     return board
 
 
+def getwinner(state):
+    '''Returns the player (0 or 1) who wins the game, based on the banners each player has now.'''
+    banners = state['banners']
+    if sum(banners[0]) != sum(banners[1]):
+        return 0 if sum(banners[0]) > sum(banners[1]) else 1
+    else:  # if there is a tie, then the owner of the largest house wins
+        return 0 if banners[0][::-1].index(1) < banners[1][::-1].index(1) else 1
+
+
+def isdecided(state):
+    '''Returns True if no remaining moves can change the outcome of the game (i.e. every banner is locked).'''
+    return None not in getlocked(state)
+
+
+def loadgame(file):
+    '''Load a recorded game (the starting board followed by the list of moves) from a text file.'''
+    with open(file, 'r') as f:
+        lines = f.read().split('\n')
+    board = [int(i) for i in ' '.join(lines[:ROWS]).split()]
+    moves = [int(i) for i in ' '.join(lines[ROWS:]).split()]
+
+    if len(board) != ROWS * COLS:
+        sys.exit('  ERROR: in loadgame, invalid board because size does not match expected dimensions')
+
+    return board, moves
+
+
 def loadplayers(players, randomize=False, verbose=False):
     '''Load AI players from file, if applicable.'''
     ai = [{}, {}]  # each player is a dictionary containing the player name and corresponding module
     for i in range(len(players)):
+        if players[i].startswith('tcp://'):  # remote player, given as tcp://host:port (see remote.py)
+            host, port = players[i][len('tcp://'):].rsplit(':', 1)
+            ai[i]['name'] = f'{host}:{port}'
+            ai[i]['module'] = importlib.import_module('remote').Remote(host, int(port))
+            continue
+
         pathname, filename = os.path.split(os.path.abspath(players[i]))
         filename = ''.join(filename.split('.')[:-1])  # remove filename extension
         ai[i]['name'] = filename  # simplify the player name for display
@@ -181,6 +381,26 @@ def loadplayers(players, randomize=False, verbose=False):
     return ai
 
 
+def loadcachedgame(cache, key):
+    '''Returns a game from the cache (its starting board, moves and record), or None if it is not there.'''
+    with sqlite3.connect(cache) as connection:
+        connection.execute('CREATE TABLE IF NOT EXISTS games (key TEXT PRIMARY KEY, game TEXT)')
+        row = connection.execute('SELECT game FROM games WHERE key = ?', (key,)).fetchone()
+    connection.close()
+
+    return json.loads(row[0]) if row else None
+
+
+def loadresult(cache, key):
+    '''Returns the result of a game from the cache, or None if it is not there.'''
+    with sqlite3.connect(cache) as connection:
+        connection.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result TEXT)')
+        row = connection.execute('SELECT result FROM results WHERE key = ?', (key,)).fetchone()
+    connection.close()
+
+    return row[0] if row else None
+
+
 def makemove(state, player, card):
     '''Move the Varys card to the position on the board specified by the card index, capturing
     cards of the same house along the way. Update the player's card collection accordingly.'''
@@ -221,6 +441,184 @@ def makemove(state, player, card):
         banners[abs(player - 1)][house - 2] = 0
 
 
+def newgame(board):
+    '''Returns the game state (as a dictionary) at the start of a game played on the given board.'''
+    cards = [[0] * len(HOUSES) for i in range(2)]  # initialize card collection for each player
+    banners = [[0] * len(HOUSES) for i in range(2)]  # initialize banner collection for each player
+
+    # Store game state as dictionary
+    state = {
+        'board': board,
+        'cards': cards,
+        'banners': banners,
+        'columns': COLS,
+        'rows': ROWS,
+        'moves': 0}
+
+    return state
+
+
+def playgame(ai, board, verbose=False, adjudicate=False, ponder=False, timings=None):
+    '''Play a game between two loaded AI players (see loadplayers) on the given board. Returns the final
+    game state and the list of moves that were made. If timings is given, the time (in seconds) each
+    player spends choosing moves is added to it.'''
+    state = newgame(board)
+    history = []
+
+    currentplayer = 0
+    while True:
+        # Show game info, if desired
+        if verbose: show(state, currentplayer)
+
+        # Is the game over (or, if desired, is the outcome already decided)?
+        validmoves = getvalidmoves(state)
+        if len(validmoves) == 0 or (adjudicate and isdecided(state)):
+            if verbose: print(f'There are no remaining moves. Game over.' if len(validmoves) == 0 else 'The outcome is decided. Game over.')
+            if ponder:  # there is nothing left to ponder, so stop
+                for i in range(2):
+                    if hasattr(ai[i]['module'], 'stoppondering'): ai[i]['module'].stoppondering(i)
+            break
+
+        # Query player to select a card
+        began = time.perf_counter()
+        whichcard = ai[currentplayer]['module'].get_computer_move(deepcopy(state), currentplayer)
+        if timings: timings[currentplayer] += time.perf_counter() - began
+
+        # Make the move if it is valid
+        if whichcard in validmoves:
+            makemove(state, currentplayer, whichcard)
+            state['moves'] += 1
+            history.append(whichcard)
+            if ponder and hasattr(ai[currentplayer]['module'], 'ponder'):  # think while the opponent decides
+                ai[currentplayer]['module'].ponder(deepcopy(state), currentplayer)
+            currentplayer = abs(currentplayer - 1)  # switch turns
+        else:
+            sys.exit(f"  ERROR: in playgame, player {currentplayer} ({ai[currentplayer]['name']}) made an invalid move")
+
+    return state, history
+
+
+def randomposition(seed=None, moves=None, cards=None):
+    '''Returns a position from a random game (the game state and the player to move), after dealing the
+    cards and making random moves, using the random module with the given seed. The game goes on for the
+    given number of moves, or until at most the given number of cards are left (or, if neither is given,
+    for a random number of moves, up to 20), unless it ends first.'''
+    random.seed(seed)
+    state = newgame(dealcards(HOUSES))
+    if moves is None and cards is None:
+        moves = random.randrange(20)
+    player = 0  # players alternate turns, starting with player 1
+    while getvalidmoves(state) and (moves is None or state['moves'] < moves) and (cards is None or sum(card > 1 for card in state['board']) > cards):
+        makemove(state, player, random.choice(getvalidmoves(state)))
+        state['moves'] += 1
+        player = 1 - player
+
+    return state, player
+
+
+def reachable(key, state):
+    '''Returns True if the position represented by key (see getkey) could still occur later in the game
+    with the given state, i.e. it is the current position or a position after one or more moves.'''
+    board = key[0]
+    current = state['board']
+
+    # Captured cards never come back, so every card still in play must either be where it is now or
+    # be captured (or replaced by the Varys card, if it is not already captured)
+    for i in range(len(current)):
+        if board[i] != current[i] and board[i] != 0 and not (board[i] == 1 and current[i] != 0):
+            return False
+
+    # Card collections can only grow
+    for player in range(2):
+        for i in range(len(HOUSES)):
+            if key[1 + player][i] < state['cards'][player][i]:
+                return False
+
+    return True
+
+
+@contextlib.contextmanager
+def replacefile(file, mode='w'):
+    '''Open a file for writing that replaces the given file in one step once it is closed, so that an
+    interrupted run never leaves the file half-written.'''
+    with open(file + '.tmp', mode) as f:
+        yield f
+    os.replace(file + '.tmp', file)
+
+
+def respond(line, cache=None, output=None):
+    '''Play the game requested by one line of JSON (see --serve), returning a line of JSON with the result.
+    The cache and results file (output), if given, are those of the server.'''
+    response = {}
+    try:
+        request = json.loads(line)
+        if 'id' in request: response['id'] = request.pop('id')
+        if 'players' not in request or not set(request) <= set(REQUEST):
+            raise ValueError(f"a request must contain players, and may only contain {', '.join(REQUEST[1:])} or id")
+        players = request['players']
+        if not isinstance(players, list) or len(players) != 2 or not all(isinstance(player, str) for player in players):
+            raise ValueError("players must be a list of two AI players")
+        with contextlib.redirect_stdout(sys.stderr):  # keep anything printed by the players out of the responses
+            response['result'] = play(**request, cache=cache, output=output)
+    except SystemExit as error:  # the game itself failed (e.g. an invalid move)
+        response['error'] = str(error).strip()
+    except Exception as error:
+        response['error'] = f'ERROR: in respond, {error}'
+
+    return json.dumps(response)
+
+
+def savegame(file, board, moves):
+    '''Save a game to a text file as the starting board (one row per line) followed by the list of moves.'''
+    with open(file, 'w') as f:
+        for i in range(ROWS):
+            f.write(' '.join(str(card) for card in board[i * COLS:(i + 1) * COLS]) + '\n')
+        f.write(' '.join(str(move) for move in moves) + '\n')
+
+
+def saverecord(file, record):
+    '''Append the record of a game to a results file, as a line of JSON or (if the file name ends in .csv)
+    a row of CSV, with a header row first in a new CSV file.'''
+    with open(file, 'a', newline='') as f:
+        if file.endswith('.csv'):
+            writer = csv.DictWriter(f, RECORD)
+            if f.tell() == 0:
+                writer.writeheader()
+            writer.writerow({field: ' '.join(map(str, value)) if isinstance(value, list) else value for field, value in record.items()})
+        else:
+            f.write(json.dumps(record) + '\n')
+
+
+def saveresult(cache, key, result, game=None):
+    '''Save the result of a game in the cache, along with the game itself (see loadcachedgame), if given.'''
+    with sqlite3.connect(cache) as connection:
+        connection.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result TEXT)')
+        connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?)', (key, result))
+        if game:
+            connection.execute('CREATE TABLE IF NOT EXISTS games (key TEXT PRIMARY KEY, game TEXT)')
+            connection.execute('INSERT OR REPLACE INTO games VALUES (?, ?)', (key, json.dumps(game)))
+    connection.close()
+
+
+def serve(port=0, cache=None, output=None):
+    '''Play games requested as lines of JSON, read from stdin or (if a port is given) from connections on
+    localhost, answering each one with a line of JSON. Every game uses the given cache and results file.'''
+    if not port:
+        for line in sys.stdin:
+            if line.strip():
+                print(respond(line, cache, output), flush=True)
+        return
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                if line.strip():
+                    self.wfile.write((respond(line, cache, output) + '\n').encode())
+
+    with socketserver.TCPServer(('localhost', port), Handler) as server:
+        server.serve_forever()
+
+
 def show(state, player):
     '''Displays relevant info about the game state.'''
     print(f"Number of Moves: {state['moves']}")
@@ -247,23 +645,22 @@ def whowins(state, players):
     '''Returns a string describing the outcome of the game, including the winner and corresponding score.'''
     # Unpack relevant info
     banners = state['banners']
-    player1 = players[0]['name']
-    player2 = players[1]['name']
+    winner = getwinner(state)
+    loser = abs(winner - 1)
 
     # Compare scores
-    if sum(banners[0]) > sum(banners[1]):
-        result = f"{player1} def {player2} {sum(banners[0])}-{sum(banners[1])}"
-    elif sum(banners[1]) > sum(banners[0]):
-        result = f"{player2} def {player1} {sum(banners[1])}-{sum(banners[0])}"
-    else:
-        if banners[0][::-1].index(1) < banners[1][::-1].index(1):
-            result = f"{player1} def {player2} {sum(banners[0])}-{sum(banners[1])} w/ tiebreaker"
-        else:
-            result = f"{player2} def {player1} {sum(banners[1])}-{sum(banners[0])} w/ tiebreaker"
+    result = f"{players[winner]['name']} def {players[loser]['name']} {sum(banners[winner])}-{sum(banners[loser])}"
+    if sum(banners[0]) == sum(banners[1]):
+        result += " w/ tiebreaker"
 
     return result
 
 
 if __name__ == "__main__":
-    result = play(**vars(parser.parse_args()))
-    print(result)
\ No newline at end of file
+    args = vars(parser.parse_args())
+    port = args.pop('serve')
+    if port is not None:
+        serve(port, args['cache'], args['output'])
+    else:
+        result = play(**args)
+        print(result)
\ No newline at end of file
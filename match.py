@@ -0,0 +1,223 @@
+# match.py
+# Play a match of many AI-only games of Hand of the King between two players, using the rules in hotk.py,
+# to decide whether the first player (e.g. a changed version of an AI) is stronger than the second. The
+# players alternate seats from one game to the next, and each game is dealt from its own seed.
+#
+# By default, a fixed number of games is played. With --sprt, the match is a sequential probability
+# ratio test instead: after every game, the log-likelihood ratio (LLR) of two hypotheses is updated
+#   H0: the first player is elo0 Elo stronger than the second (e.g. 0, no better)
+#   H1: the first player is elo1 Elo stronger than the second (e.g. 20, a real improvement)
+# and the match stops as soon as the LLR crosses either bound, accepting H1 at the upper bound and H0 at
+# the lower bound. The bounds are set so that a false positive (accepting H1 when H0 is true) happens with
+# probability alpha and a false negative with probability beta. Since games of Hand of the King cannot be
+# drawn, each game is a single win or loss.
+#
+# Every game (or pair) is dealt from its own seed, derived from the master seed, so a long match can be
+# split between machines: each runs one shard of the games (--shard i k) and saves the results (-o), and
+# --merge then combines the files into the same report as playing the whole match on one machine.
+#
+# The deal often decides a game more than the players do, so with --paired each board is played twice,
+# with the players swapping seats, and the pair counts as a single result: 1 if the first player wins
+# both games, 1/2 if the games are split, and 0 if it loses both. Luck of the deal then mostly cancels
+# out within each pair, so the results vary less and fewer games are needed for the same confidence. The
+# LLR of paired results uses the usual normal approximation (based on the mean and variance of the pair
+# results), since the exact likelihood of a pair depends on more than the Elo difference. The variance
+# needs a few pairs to settle, so a paired test never stops before MINPAIRS pairs have been played.
+
+import argparse
+import hashlib
+import hotk
+import json
+import math
+import random
+import statistics
+import sys
+
+MINPAIRS = 20  # number of pairs to play before a paired test can stop
+
+parser = argparse.ArgumentParser(description="Play a match of Game of Thrones: Hand of the King between two AI players.")
+parser.add_argument('-p', '--players', nargs=2, metavar='name', type=str, help="specify two AI players by filename (the first is tested against the second)", default=['players/randy.py', 'players/randy.py'])
+parser.add_argument('-n', '--games', metavar='n', type=int, help="number of games (or pairs of games, with --paired) to play (the most to play, with --sprt)", default=100)
+parser.add_argument('-b', '--board', metavar='file', type=str, help="file containing starting board setup (for all games)", default=None)
+parser.add_argument('-s', '--seed', metavar='n', type=int, help="master seed for random number generator (each game or pair gets its own seed from it)", default=None)
+parser.add_argument('-a', '--adjudicate', action="store_true", help="flag to end each game as soon as the outcome is decided")
+parser.add_argument('--paired', action="store_true", help="flag to play each board twice with seats swapped, scoring each pair of games together")
+parser.add_argument('-c', '--confidence', metavar='p', type=float, help="confidence level of the reported Elo interval", default=0.95)
+parser.add_argument('--sprt', nargs=2, metavar=('elo0', 'elo1'), type=float, help="stop early with a sequential probability ratio test of H0: elo0 vs H1: elo1", default=None)
+parser.add_argument('--shard', nargs=2, metavar=('i', 'k'), type=int, help="play only shard i (from 0) of k, i.e. games i, i + k, i + 2k, ... (requires a seed)", default=None)
+parser.add_argument('-o', '--output', metavar='file', type=str, help="file in which to save the results (e.g. of a shard)", default=None)
+parser.add_argument('--merge', nargs='+', metavar='file', type=str, help="combine the saved results of every shard into one report (instead of playing)", default=None)
+parser.add_argument('--alpha', metavar='p', type=float, help="probability of accepting H1 when H0 is true (with --sprt)", default=0.05)
+parser.add_argument('--beta', metavar='p', type=float, help="probability of accepting H0 when H1 is true (with --sprt)", default=0.05)
+
+
+def main(args):
+    if args.merge:
+        # Combine the results of every shard of a match
+        header, units = loadshards(args.merge)
+        names = header['names']
+        paired = header['paired']
+    else:
+        if args.shard and args.seed is None:
+            sys.exit('  ERROR: in main, a sharded match requires a seed (so that every shard deals the same games)')
+        if args.shard and args.sprt:
+            sys.exit('  ERROR: in main, a sharded match cannot stop early (--sprt)')
+
+        # Play this shard of the games (or all of them)
+        ai = hotk.loadplayers(args.players)
+        board = hotk.loadcards(args.board) if args.board else None
+        shard, shards = args.shard if args.shard else (0, 1)
+        names = [ai[0]['name'], ai[1]['name']]
+        paired = args.paired
+        units = playmatch(ai, board, args.seed, range(shard, args.games, shards), paired, args.adjudicate)
+
+        # Save the results, if desired, starting with everything needed to merge them with other shards
+        if args.output:
+            output = open(args.output, 'w')
+            header = {'names': names, 'seed': args.seed, 'games': args.games, 'paired': paired, 'shard': shard, 'shards': shards}
+            output.write(json.dumps(header) + '\n')
+    if args.sprt:
+        lower, upper = getbounds(args.alpha, args.beta)
+
+    # Tally the games until the match is over
+    wins = losses = 0
+    results = []  # score of the first player in each game (or pair of games)
+    for i, won, lost in units:
+        wins += won
+        losses += lost
+        results.append(won / 2 if paired else won)
+        if not args.merge and args.output:
+            output.write(json.dumps([i, won, lost]) + '\n')
+
+        # Report progress and, if testing, stop once there is enough evidence
+        line = f"{'Pair' if paired else 'Game'} {i + 1}: {names[0]} {wins}-{losses} {names[1]}"
+        if args.sprt:
+            ratio = pairllr(results, *args.sprt) if paired else llr(wins, losses, *args.sprt)
+            print(f"{line}, LLR = {ratio:.3f} [{lower:.3f}, {upper:.3f}]")
+            if (ratio >= upper or ratio <= lower) and not (paired and len(results) < MINPAIRS):
+                break
+        else:
+            print(line)
+    if not args.merge and args.output:
+        output.close()
+    if not results:  # e.g. a shard with no games (its results file can still be merged)
+        print(f"No {'pairs' if paired else 'games'} played")
+        return
+
+    # Summarize the match
+    low, high = interval(results, args.confidence)
+    print(f"Score: {wins / (wins + losses):.3f}, Elo difference: {elo(statistics.fmean(results)):+.1f} "
+          f"({args.confidence:.0%} confidence: {elo(low):+.1f} to {elo(high):+.1f})")
+    if args.sprt:
+        elo0, elo1 = args.sprt
+        if ratio >= upper:
+            print(f"H1 accepted: {names[0]} is {elo1:g} Elo stronger (rather than {elo0:g})")
+        elif ratio <= lower:
+            print(f"H0 accepted: {names[0]} is {elo0:g} Elo stronger (rather than {elo1:g})")
+        else:
+            print(f"Inconclusive after {wins + losses} games")
+
+
+def elo(score):
+    '''Returns the Elo difference that corresponds to an expected score (infinite for a score of 0 or 1).'''
+    if score <= 0 or score >= 1:
+        return math.copysign(math.inf, score - 0.5)
+
+    return -400 * math.log10(1 / score - 1)
+
+
+def expected(difference):
+    '''Returns the expected score of a player who is the given number of Elo stronger than the opponent.'''
+    return 1 / (1 + 10 ** (-difference / 400))
+
+
+def gameseed(seed, i):
+    '''Returns the seed for game (or pair) i of a match, or None if the match is not seeded. Each seed is
+    derived from a hash of the master seed and i, so the games are independent of each other and of
+    how they are divided between shards.'''
+    if seed is None:
+        return None
+    digest = hashlib.sha256(f'{seed}:{i}'.encode()).digest()
+
+    return int.from_bytes(digest[:8], 'big')
+
+
+def getbounds(alpha, beta):
+    '''Returns the lower and upper bounds of the LLR for a sequential probability ratio test.'''
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+def interval(results, confidence):
+    '''Returns the lower and upper limits of a confidence interval for the mean of the results.'''
+    if len(results) < 2:
+        return 0, 1
+    mean = statistics.fmean(results)
+    error = statistics.NormalDist().inv_cdf((1 + confidence) / 2) * statistics.stdev(results) / math.sqrt(len(results))
+
+    return max(mean - error, 0), min(mean + error, 1)
+
+
+def llr(wins, losses, elo0, elo1):
+    '''Returns the log-likelihood ratio of H1 (the difference is elo1) to H0 (the difference is elo0),
+    given a number of wins and losses.'''
+    p0, p1 = expected(elo0), expected(elo1)
+
+    return wins * math.log(p1 / p0) + losses * math.log((1 - p1) / (1 - p0))
+
+
+def loadshards(files):
+    '''Load the results saved by every shard of a match. Returns the header of the match and the results
+    of its games (or pairs of games), in order.'''
+    headers = []
+    units = []
+    for file in files:
+        with open(file, 'r') as f:
+            lines = f.read().splitlines()
+        headers.append(json.loads(lines[0]))
+        units += [json.loads(line) for line in lines[1:]]
+
+    # Make sure the shards are from the same match, and that none are missing or incomplete
+    header = headers[0]
+    same = ['names', 'seed', 'games', 'paired', 'shards']
+    if any([h[k] for k in same] != [header[k] for k in same] for h in headers):
+        sys.exit('  ERROR: in loadshards, the files are not all from the same match')
+    if sorted(h['shard'] for h in headers) != list(range(header['shards'])):
+        sys.exit(f"  ERROR: in loadshards, expected exactly one file for each of {header['shards']} shards")
+    units.sort()
+    if [unit[0] for unit in units] != list(range(header['games'])):
+        sys.exit('  ERROR: in loadshards, some games are missing (has every shard finished?)')
+
+    return header, units
+
+
+def pairllr(results, elo0, elo1):
+    '''Returns the (approximate) log-likelihood ratio of H1 to H0, given the score of each pair of games.
+    Each hypothesis is the same difference in Elo as for single games.'''
+    variance = statistics.pvariance(results) if len(results) > 1 else 0
+    if variance == 0:  # no evidence of how much the results vary yet
+        return 0
+    s0, s1 = expected(elo0), expected(elo1)
+
+    return len(results) * (s1 - s0) * (2 * statistics.fmean(results) - s0 - s1) / (2 * variance)
+
+
+def playmatch(ai, board, seed, indices, paired=False, adjudicate=False):
+    '''Play the games (or pairs of games) of a match with the given indices, one at a time. Yields the
+    index and the number of games won and lost by the first player.'''
+    for i in indices:
+        # Deal the board, then play it once (with the players in alternating seats) or twice (in both seats)
+        random.seed(gameseed(seed, i))
+        deal = board.copy() if board else hotk.dealcards(hotk.HOUSES)
+        won = lost = 0
+        for order in [ai, ai[::-1]] if paired else [ai if i % 2 == 0 else ai[::-1]]:
+            state, history = hotk.playgame(order, deal.copy(), adjudicate=adjudicate)
+            if order[hotk.getwinner(state)] is ai[0]:
+                won += 1
+            else:
+                lost += 1
+
+        yield i, won, lost
+
+
+if __name__ == "__main__":
+    main(parser.parse_args())
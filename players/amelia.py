@@ -9,29 +9,104 @@
 #   3) secure banners: +10 for every color that the player has > half the cards in that color,
 #      -10 for every color secured by the opponent; e.g. if a player owns 4 or more of the black
 #      cards (7 possible), then it is a guaranteed banner and cannot be stolen
-
-from hand_of_the_king import getvalidmoves
+# These weights (1, 3 and 10) are kept in WEIGHTS, so they can be changed (e.g. by tune.py).
+#
+# During the search, the heuristic is not computed from scratch at every leaf. Instead, an Evaluation
+# is updated with the effect of each move (cards captured, banners changing hands, houses secured).
+#
+# Positions in which the outcome of the game is already decided (the game is over, or the banners that
+# can no longer change hands guarantee a win or a loss) are not searched any further. Instead, they are
+# worth +WIN or -WIN, which is better or worse than any value of the heuristic.
+#
+# In batched mode (which requires numpy), the last ply of the search is expanded all at once: the cards
+# and banners after every move are stacked into arrays and scored with a single vectorized evaluation,
+# either the heuristic above or, if LINEAR is given, a linear function of the cards and banners.
+#
+# This player can also ponder (i.e. think on the opponent's time) when the game allows it; see ponder.py.
+# Moves in the opening are played from the opening book (see book.py), if there is one.
+# Search results are kept in a transposition table between moves, so that positions searched for one
+# move are not searched again for the next (only positions that can no longer occur are dropped). Entries
+# are also keyed by the settings of the evaluation (see getsettings), so changing them never reuses old ones.
+
+from book import Book
+from copy import copy, deepcopy
+from hotk import COLS, HOUSES, ROWS, getbounds, getkey, getvalidmoves, getwinner, makemove, reachable
 import math
-import copy
 import pdb
+from ponder import Ponderer
 
+try:
+    import numpy as np
+except ImportError:  # batched mode is not available without numpy
+    np = None
+
+DLSmax = 7  # limited depth (higher numbers mean go deeper, but take longer)
+WIN = 1000  # utility of a position in which the outcome is decided
+BOOK = True  # whether to play moves from the opening book (see book.py), if there is one
+BATCHED = False  # whether to evaluate the last ply of the search all at once (requires numpy)
+WEIGHTS = [1, 3, 10]  # heuristic weights for each card, banner and secured banner
+LINEAR = None  # in batched mode, optional weights for the player's cards, opponent's cards, player's banners and opponent's banners in each house (4 x 7 values), used instead of the heuristic
+EXACT, LOWER, UPPER = 0, 1, 2  # types of utility stored in the transposition table
+
+nodes = 0  # number of positions searched so far (e.g. for benchmarks; see bench.py)
+table = {}  # transposition table, mapping (position, player, player to move, settings) to (depth, utility, type, best move)
 
-def get_computer_move(board, cards, banners, turn):
-    '''Returns the best move for given player, based on current game state.'''
-    # Copy all mutable objects
-    boardCopy = copy.deepcopy(board)
-    bannersCopy = copy.deepcopy(banners)
-    cardsCopy = copy.deepcopy(cards)
 
-    # Setup minimax
-    DLSmax = 7  # limited depth (higher numbers mean go deeper, but take longer)
-    moves = getvalidmoves(boardCopy)
+def get_computer_move(state, whichplayer):
+    '''Returns the best move for given player, based on current game state.'''
+    # Use the result of pondering or the opening book, if available
+    move = pondering[whichplayer].answer(state)
+    if move is None and BOOK:
+        move = opening.probe(state, whichplayer)
+    if move is None:
+        move = search(state, whichplayer)
+
+    return move
+
+
+def ponder(state, whichplayer):
+    '''Start searching for answers to the opponent's likely replies in the background. The state should
+    be the current game state, with the opponent of the given player about to move.'''
+    # Try the replies that look best for the opponent first
+    opponent = abs(whichplayer - 1)
+    replies = getvalidmoves(state)
+    utilities = {}
+    for reply in replies:
+        statecopy = deepcopy(state)
+        makemove(statecopy, opponent, reply)
+        utilities[reply] = heuristic(statecopy['cards'], statecopy['banners'], opponent, whichplayer)
+    replies.sort(key=lambda reply: utilities[reply], reverse=True)
+
+    pondering[whichplayer].start(state, whichplayer, replies)
+
+
+def stoppondering(whichplayer):
+    '''Stop searching in the background (e.g. because the game is over).'''
+    pondering[whichplayer].stop()
+
+
+def forget(state):
+    '''Remove the positions from the transposition table that cannot occur anymore after the given state,
+    or that were searched with other settings (updating the settings to the current ones).'''
+    global settings
+    settings = getsettings()
+    for position in [position for position in table if not reachable(position[0], state) or position[3] != settings]:
+        del table[position]
+
+
+def search(state, player):
+    '''Returns the move with the best utility for the given player, using depth-limited minimax.'''
+    forget(state)
+    evaluation = Evaluation(state)
+    moves = getvalidmoves(state)
     bestMove = moves[0]  # default best move is first move
-    utility = minval(boardCopy, turn, bestMove, bannersCopy, cardsCopy, -math.inf, math.inf, DLSmax)
+    utility = minval(state, evaluation, player, bestMove, -math.inf, math.inf, DLSmax)
 
     # Loop through all possible moves, finding one with best utility
     for move in moves[1:]:
-        util = minval(boardCopy, turn, move, bannersCopy, cardsCopy, -math.inf, math.inf, DLSmax)
+        if utility == WIN:  # nothing can be better
+            break
+        util = minval(state, evaluation, player, move, -math.inf, math.inf, DLSmax)
         if util > utility:
             bestMove = move
             utility = util
@@ -39,99 +114,259 @@ def get_computer_move(board, cards, banners, turn):
     return bestMove
 
 
-def minval(board, player, move, banners, cards, a, b, DLSmax):
+def minval(state, evaluation, player, move, a, b, DLSmax):
     '''Returns the minimum utility available from a move on the board.'''
+    global nodes
+    nodes += 1
+
     # Copy all mutable objects
-    boardCopy = copy.deepcopy(board)
-    bannersCopy = copy.deepcopy(banners)
-    cardsCopy = copy.deepcopy(cards)
+    stateCopy = deepcopy(state)
+    evaluationCopy = evaluation.copy()
 
     # Decrease depth
     DLSmax -= 1
 
     # Simulate move of current player
-    simulate(boardCopy, player, move, bannersCopy, cardsCopy)
+    evaluationCopy.makemove(stateCopy, player, move)
     nextPlayer = abs(1 - player)
 
-    # Check if this move ends the game or the search
-    moves = getvalidmoves(boardCopy)
-    if len(moves) == 0 or DLSmax == 0:
-        return heuristic(cardsCopy, bannersCopy, player, nextPlayer)
+    # Check if this move ends the game, decides its outcome, or ends the search
+    moves = getvalidmoves(stateCopy)
+    if len(moves) == 0:
+        return WIN if getwinner(stateCopy) == player else -WIN
+    worst, best = getbounds(stateCopy, player)
+    if worst == best:
+        return worst * WIN
+    if DLSmax == 0:
+        return evaluationCopy.get(player)
+
+    # Check if this position has already been searched
+    position = (getkey(stateCopy), player, nextPlayer, settings)
+    depth = getdepth(stateCopy, DLSmax)
+    utility = lookup(position, depth, a, b, moves)
+    if utility is not None:
+        return utility
 
     # If search is not over, find minimum utility from possible moves
+    a0, b0 = a, b  # original bounds, needed to store the result
     utility = math.inf
+    bestMove = moves[0]
+    if BATCHED and np and DLSmax == 1:  # the possible moves are the last ones, so evaluate them all at once
+        utilities = batchutility(stateCopy, nextPlayer, moves, player)
+        nodes += len(moves)  # the same positions that the loop below would search
+        bestMove = moves[utilities.argmin()]
+        utility = utilities.min().item()
+        moves = []
     for nextMove in moves:
-        utility = min(utility, maxval(boardCopy, nextPlayer, nextMove, bannersCopy, cardsCopy, a, b, DLSmax))
-        if utility <= a:
-            return utility
+        util = maxval(stateCopy, evaluationCopy, nextPlayer, nextMove, a, b, DLSmax)
+        if util < utility:
+            bestMove = nextMove
+            utility = util
+        if utility <= a or utility == -WIN:  # the rest cannot change the result
+            break
         b = min(b, utility)
 
+    store(position, depth, utility, a0, b0, bestMove)
     return utility
 
 
-def maxval(board, player, move, banners, cards, a, b, DLSmax):
+def maxval(state, evaluation, player, move, a, b, DLSmax):
     '''Returns the maximum utility available from a move on the board.'''
+    global nodes
+    nodes += 1
+
     # Copy all mutable objects
-    boardCopy = copy.deepcopy(board)
-    bannersCopy = copy.deepcopy(banners)
-    cardsCopy = copy.deepcopy(cards)
+    stateCopy = deepcopy(state)
+    evaluationCopy = evaluation.copy()
 
     # Decrease depth
     DLSmax -= 1
 
     # Simulate move of current player
-    simulate(boardCopy, player, move, bannersCopy, cardsCopy)
+    evaluationCopy.makemove(stateCopy, player, move)
     nextPlayer = abs(1 - player)
 
-    # Check if this move ends the game or the search
-    moves = getvalidmoves(boardCopy)
-    if len(moves) == 0 or DLSmax == 0:
-        return heuristic(cardsCopy, bannersCopy, nextPlayer, player)
+    # Check if this move ends the game, decides its outcome, or ends the search
+    moves = getvalidmoves(stateCopy)
+    if len(moves) == 0:
+        return WIN if getwinner(stateCopy) == nextPlayer else -WIN
+    worst, best = getbounds(stateCopy, nextPlayer)
+    if worst == best:
+        return worst * WIN
+    if DLSmax == 0:
+        return evaluationCopy.get(nextPlayer)
+
+    # Check if this position has already been searched
+    position = (getkey(stateCopy), nextPlayer, nextPlayer, settings)
+    depth = getdepth(stateCopy, DLSmax)
+    utility = lookup(position, depth, a, b, moves)
+    if utility is not None:
+        return utility
 
     # If game is not over, find maximum utility from possible moves
+    a0, b0 = a, b  # original bounds, needed to store the result
     utility = -math.inf
+    bestMove = moves[0]
+    if BATCHED and np and DLSmax == 1:  # the possible moves are the last ones, so evaluate them all at once
+        utilities = batchutility(stateCopy, nextPlayer, moves, nextPlayer)
+        nodes += len(moves)  # the same positions that the loop below would search
+        bestMove = moves[utilities.argmax()]
+        utility = utilities.max().item()
+        moves = []
     for nextMove in moves:
-        utility = max(utility, minval(boardCopy, nextPlayer, nextMove, bannersCopy, cardsCopy, a, b, DLSmax))
-        if utility >= b:
-            return utility
+        util = minval(stateCopy, evaluationCopy, nextPlayer, nextMove, a, b, DLSmax)
+        if util > utility:
+            bestMove = nextMove
+            utility = util
+        if utility >= b or utility == WIN:  # the rest cannot change the result
+            break
         a = max(a, utility)
 
+    store(position, depth, utility, a0, b0, bestMove)
     return utility
 
 
-def simulate(board, player, move, banners, cards):
-    '''Update game state based on a potential move made by a specific player.'''
-    startIndex = board.index(1)  # starting index of 1-card
-    color = board[move]  # color of captured card
-    count = 1  # number of cards collected after move
-    board[move] = 1  # move 1 card to correct spot
-    board[startIndex] = 0  # remove card from start spot
-
-    # Find out what direction the move was in and calculate step value to loop through column or row
-    if move < startIndex:
-        if startIndex - move >= 6:  # moved up
-            step = -6
-        else:  # moved left
-            step = -1
-    else:
-        if move - startIndex >= 6:  # moved down
-            step = 6
-        else:  # moved right
-            step = 1
-
-    # Loop through cards passed, seeing if more than 1 needs to be collected
-    for i in range(startIndex, move, step):
-        if board[i] == color:  # remove that card because it will be picked up
-            board[i] == 0
-            count += 1
+def batchutility(state, player, moves, root):
+    '''Returns an array with the utility (for root) after each of the given moves by player, computed
+    for all moves at once. This is the same as the utility of each move at the end of the search.'''
+    # Stack the board after each move (one row per move)
+    board = np.array(state['board'])
+    varys = state['board'].index(1)
+    moves = np.array(moves)
+    k = np.arange(len(moves))
+    houses = board[moves] - 2  # index of the house being captured by each move
+    boards = np.tile(board, (len(moves), 1))
+    captured = BETWEEN[varys][moves] & (boards == board[moves][:, None])  # cards captured along the way
+    boards[captured] = 0
+    boards[:, varys] = 0
+    boards[k, moves] = 1
+
+    # Stack the cards and banners after each move (K x 2 x 7 arrays)
+    cards = np.tile(np.array(state['cards']), (len(moves), 1, 1))
+    banners = np.tile(np.array(state['banners']), (len(moves), 1, 1))
+    cards[k, player, houses] += 1 + captured.sum(axis=1)
+    taken = cards[k, player, houses] >= cards[k, abs(player - 1), houses]
+    banners[k[taken], player, houses[taken]] = 1
+    banners[k[taken], abs(player - 1), houses[taken]] = 0
+
+    # Evaluate every move, from the root player's point of view
+    ours, theirs = cards[:, root], cards[:, abs(root - 1)]
+    oursBanners, theirsBanners = banners[:, root], banners[:, abs(root - 1)]
+    if LINEAR is None:  # heuristic
+        sizes = np.array(HOUSES)
+        utilities = (WEIGHTS[0] * (ours.sum(axis=1) - theirs.sum(axis=1))
+                     + WEIGHTS[1] * (oursBanners.sum(axis=1) - theirsBanners.sum(axis=1))
+                     + WEIGHTS[2] * ((2 * ours > sizes).sum(axis=1) - (2 * theirs > sizes).sum(axis=1)))
+    else:  # linear function of cards and banners
+        features = np.concatenate((ours, theirs, oursBanners, theirsBanners), axis=1)
+        utilities = features @ np.ravel(LINEAR)
+
+    # Moves that decide the outcome (see hotk.getbounds) are worth +WIN or -WIN instead
+    remaining = np.array(HOUSES) - ours - theirs
+    oursLocked = (oursBanners == 1) & ((remaining == 0) | (theirs + remaining < ours))
+    theirsLocked = (theirsBanners == 1) & ((remaining == 0) | (ours + remaining < theirs))
+    oursCount, theirsCount = oursLocked.sum(axis=1), theirsLocked.sum(axis=1)
+    undecided = len(HOUSES) - oursCount - theirsCount
+    worst = np.where((oursCount > theirsCount + undecided) | ((oursCount == theirsCount + undecided) & oursLocked[:, -1]), 1, -1)
+    best = np.where((theirsCount > oursCount + undecided) | ((theirsCount == oursCount + undecided) & theirsLocked[:, -1]), -1, 1)
+    utilities = np.where(worst == best, worst * WIN, utilities)
+
+    # Moves that end the game (no cards left in the row or column of the Varys card) are worth +WIN or -WIN
+    # for the winner, who has more banners or, if tied, the banner of the largest house
+    over = ~((boards > 1) & LINES[moves]).any(axis=1)
+    margin = oursBanners.sum(axis=1) - theirsBanners.sum(axis=1)
+    largest = (oursBanners * np.arange(1, len(HOUSES) + 1)).max(axis=1) > (theirsBanners * np.arange(1, len(HOUSES) + 1)).max(axis=1)
+    won = (margin > 0) | ((margin == 0) & largest)
+    utilities = np.where(over, np.where(won, WIN, -WIN), utilities)
+
+    return utilities
+
+
+class Evaluation:
+    '''The utility of a game state for player 1 based on the heuristic (for player 2, it is the same
+    except for the sign), which is kept up to date as moves are made.'''
+
+    def __init__(self, state):
+        self.utility = heuristic(state['cards'], state['banners'], 0, 1)
+
+    def copy(self):
+        '''Returns a copy of the evaluation.'''
+        return copy(self)
+
+    def get(self, player):
+        '''Returns the utility for the given player.'''
+        return self.utility if player == 0 else -self.utility
+
+    def makemove(self, state, player, card):
+        '''Make a move (see hotk.makemove), updating the utility with its effect.'''
+        # Remember the relevant info from before the move
+        cards = state['cards']
+        banners = state['banners']
+        opponent = abs(player - 1)
+        i = state['board'][card] - 2  # index of the house being captured
+        before = cards[player][i]
+        owned = banners[player][i]
+        stolen = banners[opponent][i]
+
+        makemove(state, player, card)
+
+        # Add +1 for each card captured
+        change = WEIGHTS[0] * (cards[player][i] - before)
+
+        # Add +3 if the banner is captured, and another +3 if it was taken from the opponent
+        if banners[player][i] and not owned:
+            change += WEIGHTS[1] * (1 + stolen)
+
+        # Add +10 if the banner is now secured
+        if before <= (i + 2) / 2 < cards[player][i]:
+            change += WEIGHTS[2]
+
+        self.utility += change if player == 0 else -change
+
+
+def getdepth(state, DLSmax):
+    '''Returns the depth to which a position is searched, which is infinite (i.e. exact) if the game must
+    end before the depth limit is reached, because every move captures at least one card.'''
+    cardsleft = len(state['board']) - state['board'].count(0) - 1  # not including the Varys card
+    return math.inf if cardsleft <= DLSmax else DLSmax
+
+
+def getsettings():
+    '''Returns a number that identifies the settings that utilities depend on (BATCHED, LINEAR and WEIGHTS).
+    It is part of the key of every table entry, so that entries are never used after the settings change.'''
+    return hash((bool(BATCHED and np), repr(LINEAR), tuple(WEIGHTS)))
+
+
+def gettable():
+    '''Returns the transposition table (so that pondering can add to the one in use).'''
+    return table
+
+
+def lookup(position, depth, a, b, moves):
+    '''Returns the utility of a position from the transposition table if it was searched to the same depth
+    and is useful given the bounds (a, b); otherwise, returns None after moving the best move found
+    previously (if any) to the front of the list of moves so that it is searched first.'''
+    entry = table.get(position)
+    if entry is None:
+        return None
+    if entry[0] == depth:
+        utility, flag = entry[1], entry[2]
+        if flag == EXACT or (flag == LOWER and utility >= b) or (flag == UPPER and utility <= a):
+            return utility
+    moves.remove(entry[3])
+    moves.insert(0, entry[3])
 
-    # Update card collection for player
-    cards[player][color - 2] += count
 
-    # Update banner collection, if needed
-    if cards[player][color - 2] >= cards[abs(player - 1)][color - 2]:
-        banners[player][color - 2] = 1
-        banners[abs(player - 1)][color - 2] = 0
+def store(position, depth, utility, a, b, bestMove):
+    '''Save the utility of a position in the transposition table, noting whether it is exact or only a
+    bound because the search was cut off by the bounds (a, b) it was given.'''
+    if utility <= a:
+        flag = UPPER
+    elif utility >= b:
+        flag = LOWER
+    else:
+        flag = EXACT
+    table[position] = (depth, utility, flag, bestMove)
 
 
 def heuristic(cards, banners, player, opponent):
@@ -140,18 +375,37 @@ def heuristic(cards, banners, player, opponent):
     utility = 0
 
     # Add +1 for player cards, -1 for opponent cards
-    utility += sum(cards[player])
-    utility -= sum(cards[opponent])
+    utility += WEIGHTS[0] * sum(cards[player])
+    utility -= WEIGHTS[0] * sum(cards[opponent])
 
     # Add +3 for player banners, -3 for opponent banners
-    utility += 3 * sum(banners[player])
-    utility -= 3 * sum(banners[opponent])
+    utility += WEIGHTS[1] * sum(banners[player])
+    utility -= WEIGHTS[1] * sum(banners[opponent])
 
     # Add +10 for player banners secured, -10 for opponent banners secured
     for i in range(len(cards[player])):
         if cards[player][i] > (i + 2) / 2:  # player owns banner
-            utility += 10
+            utility += WEIGHTS[2]
         if cards[opponent][i] > (i + 2) / 2:  # opponent owns banner
-            utility -= 10
+            utility -= WEIGHTS[2]
 
     return utility
+
+
+settings = getsettings()  # settings of the current search (see search)
+pondering = [Ponderer(search, gettable), Ponderer(search, gettable)]  # one for each player
+opening = Book()  # opened the first time it is needed
+DATA = [opening.file]  # data files that affect the moves of this player (see hotk.getcachekey)
+
+# Tables for batched mode: BETWEEN[i][j] marks the positions strictly between positions i and j (if they
+# are in the same row or column), and LINES[i] marks the other positions in the same row and column as i
+if np:
+    BETWEEN = np.zeros((ROWS * COLS, ROWS * COLS, ROWS * COLS), dtype=bool)
+    LINES = np.zeros((ROWS * COLS, ROWS * COLS), dtype=bool)
+    for i in range(ROWS * COLS):
+        for j in range(ROWS * COLS):
+            if i // COLS == j // COLS:  # same row
+                BETWEEN[i, j, min(i, j) + 1:max(i, j)] = True
+            elif i % COLS == j % COLS:  # same column
+                BETWEEN[i, j, min(i, j) + COLS:max(i, j):COLS] = True
+            LINES[i, j] = i != j and (i // COLS == j // COLS or i % COLS == j % COLS)
@@ -3,10 +3,13 @@
 # This player is equipped to apply minimax for making decision after a specified
 # number of moves. In the early game, it moves randomly.
 #
-# No pruning, no depth-limiting heuristic, no nonsense. :)
+# No depth-limiting heuristic, no nonsense. :) The utility of every position searched is kept between
+# moves, though, since the next search is two moves further down the same game tree. The only pruning
+# is of positions whose outcome is already decided (see hotk.getbounds) and of moves that cannot do
+# better than a win (or worse than a loss) that has already been found.
 
 from copy import deepcopy
-from hotk import getvalidmoves, makemove
+from hotk import getbounds, getkey, getvalidmoves, makemove, reachable
 import math
 import pdb
 import random
@@ -14,6 +17,9 @@ import random
 WIN = 1
 LOSS = -1
 
+table = {}  # utility (for player 1) of each position searched, keyed by (position, player to move)
+nodes = 0  # number of positions searched (for measuring the search, e.g. by suite.py)
+
 
 def get_computer_move(state, whichplayer):
     '''Returns the best move for the current player based on game state (board, cards, banners).'''
@@ -25,13 +31,25 @@ def get_computer_move(state, whichplayer):
         return minimax(state, whichplayer)
 
 
+def search(state, player):
+    '''Returns the optimal move for the given player at any point of the game (unlike get_computer_move,
+    which moves randomly in the early game).'''
+    return minimax(state, player)
+
+
 def minimax(state, player):
     '''Runs minimax to find the optimal move for the current player.'''
+    # Forget positions that cannot occur anymore
+    for position in [position for position in table if not reachable(position[0], state)]:
+        del table[position]
+
     # Loop through all possible moves, finding one with best (maximum) utility
     moves = getvalidmoves(state)
     bestmove = moves[0]  # default best move is first move
     bestutil = minval(state, player, bestmove)
     for move in moves[1:]:
+        if bestutil == WIN:  # nothing can be better
+            break
         util = minval(state, player, move)
         if util > bestutil:
             bestmove = move
@@ -42,6 +60,9 @@ def minimax(state, player):
 
 def minval(state, maxplayer, maxmove):
     '''Returns the minimum utility available after allowing the maxplayer (us) to make a move.'''
+    global nodes
+    nodes += 1
+
     # Copy all mutable objects
     statecopy = deepcopy(state)
 
@@ -54,15 +75,32 @@ def minval(state, maxplayer, maxmove):
     if len(moves) == 0:
         return utility(statecopy, maxplayer, minplayer)
 
+    # Check if the outcome is already decided
+    worst, best = getbounds(statecopy, maxplayer)
+    if worst == best:
+        return WIN if worst == 1 else LOSS
+
+    # Check if this position has already been searched (by either player)
+    position = (getkey(statecopy), minplayer)
+    sign = 1 if maxplayer == 0 else -1  # utility is the same for both players, except for the sign
+    if position in table:
+        return sign * table[position]
+
     # If game is not over, find minimum value from possible moves
     value = math.inf
     for minmove in moves:
         value = min(value, maxval(statecopy, minplayer, minmove))
+        if value == LOSS:  # nothing can be worse
+            break
+    table[position] = sign * value
     return value
 
 
 def maxval(state, minplayer, minmove):
     '''Returns the maximum utility available after allowing the minplayer (our opponent) to make a move.'''
+    global nodes
+    nodes += 1
+
     # Copy all mutable objects
     statecopy = deepcopy(state)
 
@@ -75,10 +113,24 @@ def maxval(state, minplayer, minmove):
     if len(moves) == 0:
         return utility(statecopy, maxplayer, minplayer)
 
+    # Check if the outcome is already decided
+    worst, best = getbounds(statecopy, maxplayer)
+    if worst == best:
+        return WIN if worst == 1 else LOSS
+
+    # Check if this position has already been searched
+    position = (getkey(statecopy), maxplayer)
+    sign = 1 if maxplayer == 0 else -1  # utility is the same for both players, except for the sign
+    if position in table:
+        return sign * table[position]
+
     # If game is not over, find minimum value from possible moves
     value = -math.inf
     for maxmove in moves:
         value = max(value, minval(statecopy, maxplayer, maxmove))
+        if value == WIN:  # nothing can be better
+            break
+    table[position] = sign * value
     return value
 
 
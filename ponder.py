@@ -0,0 +1,106 @@
+# ponder.py
+# Support for AI players that think on their opponent's time. After making a move, a player can start
+# a Ponderer, which searches the opponent's likely replies (most likely first) in a background process
+# and reports the best answer to each one. When the opponent has moved, the player asks the Ponderer
+# for the answer to the actual position: an answer that was already found is returned immediately, a
+# search that is already underway for that position is allowed to finish, and anything else is stopped.
+#
+# If the player keeps a transposition table, the entries found by each finished search are sent back too,
+# and those that can still occur are added to the player's table. The player then carries on from a warm
+# table, both after an answer (the next search is further down the same tree) and when the actual reply
+# was not searched in time.
+#
+# Pondering uses a separate process (rather than a thread) so that it does not compete with the
+# opponent for the Python interpreter.
+
+from copy import deepcopy
+from hotk import getkey, getvalidmoves, makemove, reachable
+import multiprocessing
+import queue
+
+
+class Ponderer:
+    '''Searches for the best answers to an opponent's replies in a background process.'''
+
+    def __init__(self, search, table=None):
+        # search is a module-level function search(state, whichplayer) that returns the best move for whichplayer
+        self.search = search
+        # table, if given, is a module-level function that returns the player's transposition table (a
+        # dictionary whose keys start with the position, see hotk.getkey)
+        self.table = table
+        self.answers = {}  # best move for each position that has been searched, keyed by position
+        self.entries = {}  # transposition table entries found by the searches that have finished
+        self.current = None  # position currently being searched
+        self.process = None
+        self.messages = None
+
+    def start(self, state, whichplayer, replies):
+        '''Start searching, in order, the positions after each of the replies available to the opponent
+        of whichplayer in the current state (i.e. the opponent is about to move).'''
+        self.stop()
+        self.answers = {}
+        self.entries = {}
+        self.current = None
+        self.messages = multiprocessing.Queue()  # a queue, so that sending table entries never holds up the search
+        self.process = multiprocessing.Process(target=_ponder, args=(self.search, self.table, state, whichplayer, replies, self.messages), daemon=True)
+        self.process.start()
+
+    def stop(self):
+        '''Stop pondering, abandoning any search that is underway.'''
+        if self.process:
+            self.process.terminate()
+            self.process.join()
+            self.messages.close()
+            self.process = None
+
+    def answer(self, state):
+        '''Stop pondering and return the best move for the current player in this state, or None if
+        the position was not searched in time. Table entries that were found and can still occur are
+        added to the player's table either way.'''
+        position = getkey(state)
+
+        # Collect the answers found so far, waiting for this position if it is being searched right now
+        while self.process and position not in self.answers:
+            waiting = self.current == position
+            try:
+                searched, move, entries = self.messages.get(timeout=0.1) if waiting else self.messages.get_nowait()
+            except queue.Empty:
+                if waiting and self.process.is_alive():
+                    continue
+                break  # nothing more has been found (or pondering finished on its own)
+            if move is None:  # a new search has started
+                self.current = searched
+            else:
+                self.answers[searched] = move
+                self.entries.update(entries)
+        self.stop()
+
+        # Warm up the player's table with what was found
+        if self.table:
+            table = self.table()
+            for key, entry in self.entries.items():
+                if reachable(key[0], state):
+                    table[key] = entry
+        self.entries = {}
+
+        return self.answers.get(position)
+
+
+def _ponder(search, table, state, whichplayer, replies, messages):
+    '''Search for the best answer to each reply, sending (position, None, None) when each search starts
+    and (position, move, entries) when it finishes, where entries are the player's table entries (if any).'''
+    for reply in replies:
+        # Simulate the reply of the opponent
+        after = deepcopy(state)
+        makemove(after, abs(whichplayer - 1), reply)
+        after['moves'] += 1
+        if len(getvalidmoves(after)) == 0:  # the game is over, so there is nothing to answer
+            continue
+
+        # Find the best answer to the reply
+        position = getkey(after)
+        messages.put((position, None, None))
+        move = search(after, whichplayer)
+        messages.put((position, move, dict(table()) if table else {}))  # a copy, since the next search changes the table
+    messages.close()
+    messages.join_thread()  # make sure everything is sent before the process ends
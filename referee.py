@@ -0,0 +1,105 @@
+# referee.py
+# Play many AI-only games of Hand of the King at the same time on one asyncio event loop, using the rules in
+# hotk.py. A player's get_computer_move may be a coroutine (async def), e.g. for a player that waits on a
+# remote model or another process, in which case other games carry on while it waits. Ordinary
+# (synchronous) players are run in an executor instead, so they do not block the event loop either.
+#
+# Synchronous players keep their state in module-level variables (e.g. transposition tables) that are not
+# safe to use from several threads at once, so by default the executor has a single thread: their moves
+# are made one at a time, in between the moves of coroutine players.
+
+import argparse
+import asyncio
+import concurrent.futures
+from copy import deepcopy
+import hotk
+import inspect
+from match import gameseed
+import random
+import sys
+
+parser = argparse.ArgumentParser(description="Play many games of Game of Thrones: Hand of the King at once.")
+parser.add_argument('-p', '--players', nargs=2, metavar='name', type=str, help="specify two AI players by filename", default=['players/randy.py', 'players/randy.py'])
+parser.add_argument('-n', '--games', metavar='n', type=int, help="number of games to play", default=100)
+parser.add_argument('-j', '--concurrency', metavar='n', type=int, help="number of games in progress at once", default=100)
+parser.add_argument('-w', '--workers', metavar='n', type=int, help="number of threads for synchronous players (only safe above 1 for players without shared state)", default=1)
+parser.add_argument('-b', '--board', metavar='file', type=str, help="file containing starting board setup (for all games)", default=None)
+parser.add_argument('-s', '--seed', metavar='n', type=int, help="master seed for random number generator (each game gets its own seed from it)", default=None)
+parser.add_argument('-a', '--adjudicate', action="store_true", help="flag to end each game as soon as the outcome is decided")
+
+
+def main(args):
+    ai = hotk.loadplayers(args.players)
+    board = hotk.loadcards(args.board) if args.board else None
+
+    # Deal every board up front (players alternate seats from one game to the next)
+    games = []
+    for i in range(args.games):
+        random.seed(gameseed(args.seed, i))
+        games.append((ai if i % 2 == 0 else ai[::-1], board.copy() if board else hotk.dealcards(hotk.HOUSES)))
+
+    # Play the games, reporting each result as soon as it is known
+    wins = asyncio.run(report(games, args.concurrency, args.workers, args.adjudicate))
+    print(', '.join(f"{name}: {wins[name]} wins" for name in wins))
+
+
+async def getmove(player, state, whichplayer, executor):
+    '''Returns the move chosen by an AI player, awaiting it if get_computer_move is a coroutine and
+    running it in the executor otherwise.'''
+    get_computer_move = player['module'].get_computer_move
+    if inspect.iscoroutinefunction(get_computer_move):
+        return await get_computer_move(state, whichplayer)
+
+    return await asyncio.get_running_loop().run_in_executor(executor, get_computer_move, state, whichplayer)
+
+
+async def playgame(ai, board, executor, adjudicate=False):
+    '''Play a game between two loaded AI players (see hotk.loadplayers) on the given board, like
+    hotk.playgame. Returns the final game state.'''
+    state = hotk.newgame(board)
+
+    currentplayer = 0
+    while True:
+        # Is the game over (or, if desired, is the outcome already decided)?
+        validmoves = hotk.getvalidmoves(state)
+        if len(validmoves) == 0 or (adjudicate and hotk.isdecided(state)):
+            break
+
+        # Query player to select a card, then make the move if it is valid
+        whichcard = await getmove(ai[currentplayer], deepcopy(state), currentplayer, executor)
+        if whichcard in validmoves:
+            hotk.makemove(state, currentplayer, whichcard)
+            state['moves'] += 1
+            currentplayer = abs(currentplayer - 1)  # switch turns
+        else:
+            sys.exit(f"  ERROR: in playgame, player {currentplayer} ({ai[currentplayer]['name']}) made an invalid move")
+
+    return state
+
+
+async def playgames(games, concurrency, workers=1, adjudicate=False):
+    '''Play games (each a pair of the players in seat order and the board), with at most concurrency games
+    in progress at once. Yields the players and final state of each game as it finishes.'''
+    semaphore = asyncio.Semaphore(concurrency)
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        async def limited(ai, board):
+            async with semaphore:
+                return ai, await playgame(ai, board, executor, adjudicate)
+
+        for game in asyncio.as_completed([limited(ai, board) for ai, board in games]):
+            yield await game
+
+
+async def report(games, concurrency, workers=1, adjudicate=False):
+    '''Play games (see playgames), printing the result of each one as it finishes. Returns the number of
+    wins for each player.'''
+    wins = {player['name']: 0 for player in games[0][0]} if games else {}
+    async for ai, state in playgames(games, concurrency, workers, adjudicate):
+        wins[ai[hotk.getwinner(state)]['name']] += 1
+        print(hotk.whowins(state, ai))
+
+    return wins
+
+
+if __name__ == "__main__":
+    main(parser.parse_args())
@@ -0,0 +1,163 @@
+# remote.py
+# Play against AI players that run in another process (or on another machine). A remote player is given to
+# hotk.py (or match.py, referee.py, ...) as tcp://host:port, and each of its moves is requested from a
+# server at that address. Running this file starts such a server for any AI player file, e.g.
+#   $ python remote.py players/minimax.py --port 9000
+#   $ python hotk.py -p players/randy.py tcp://localhost:9000
+#
+# Protocol: every message is a JSON object, sent as a 4-byte (big-endian) length followed by the JSON
+# text. The referee sends {"state": state, "player": whichplayer} and the server answers {"move": card} (or
+# {"error": message}). Connections are kept open and reused for many moves and games: each address has a
+# pool of idle connections, and a new one is only opened when every pooled connection is in use (e.g. by
+# games in other threads). A server that does not answer within the timeout forfeits the game. A pooled
+# connection may have been closed by the server while it was idle (e.g. because the server restarted), so
+# if a reused connection fails before any of the reply arrives, the request is sent once more on a new
+# connection.
+
+import argparse
+import hotk
+import json
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+
+TIMEOUT = 10  # default time (in seconds) to wait for each move from a remote player
+
+parser = argparse.ArgumentParser(description="Serve the moves of an AI player for Game of Thrones: Hand of the King over TCP.")
+parser.add_argument('player', metavar='name', type=str, help="AI player to serve, by filename")
+parser.add_argument('--host', metavar='address', type=str, help="address to listen on", default='localhost')
+parser.add_argument('--port', metavar='n', type=int, help="port to listen on", default=9000)
+
+pools = {}  # idle connections to each address, shared by all remote players
+lock = threading.Lock()  # protects pools
+
+
+class Remote:
+    '''An AI player whose moves are made by a server at the given address (see the protocol above).'''
+
+    def __init__(self, host, port, timeout=TIMEOUT):
+        self.address = (host, port)
+        self.timeout = timeout
+
+    def get_computer_move(self, state, whichplayer):
+        reuse = True
+        while True:
+            connection, reused = getconnection(self.address, self.timeout, reuse)
+            try:
+                deadline = time.monotonic() + self.timeout
+                connection.settimeout(self.timeout)
+                send(connection, {'state': state, 'player': whichplayer})
+                reply = receive(connection, deadline)
+            except (OSError, ValueError) as error:
+                connection.close()
+                if reused and isinstance(error, ConnectionError):  # reset (or broken) before any reply
+                    reuse = False
+                    continue
+                sys.exit(f'  ERROR: in get_computer_move, no move from remote player at {self.address[0]}:{self.address[1]} ({str(error) or "timed out"})')
+            if reply is None and reused:  # closed before any reply
+                connection.close()
+                reuse = False
+                continue
+            if reply is None or 'move' not in reply:
+                connection.close()
+                sys.exit(f"  ERROR: in get_computer_move, remote player at {self.address[0]}:{self.address[1]} failed ({(reply or {}).get('error', 'connection closed')})")
+            break
+
+        # The connection can be reused once the whole reply has been read
+        with lock:
+            pools.setdefault(self.address, []).append(connection)
+
+        return reply['move']
+
+
+class Handler(socketserver.StreamRequestHandler):
+    '''Answers requests for moves on one connection until the referee closes it.'''
+
+    def handle(self):
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while True:
+            try:
+                request = receive(self.connection)
+            except ValueError:  # the connection was closed in the middle of a request (or it was not JSON)
+                break
+            if request is None:  # the connection was closed
+                break
+            try:
+                with self.server.lock:  # players are not safe to use from several threads at once
+                    reply = {'move': self.server.player.get_computer_move(request['state'], request['player'])}
+            except (Exception, SystemExit) as error:
+                reply = {'error': f'{type(error).__name__}: {error}'}
+            send(self.connection, reply)
+
+
+def main(args):
+    ai = hotk.loadplayers([args.player, args.player])
+    server = socketserver.ThreadingTCPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    server.player = ai[0]['module']
+    server.lock = threading.Lock()
+    print(f"Serving {args.player} on {args.host}:{args.port}")
+    with server:
+        server.serve_forever()
+
+
+def getconnection(address, timeout=TIMEOUT, reuse=True):
+    '''Returns an idle connection to the address from its pool (if reuse is True), or a new connection if
+    there is none, along with whether it was reused.'''
+    with lock:
+        if reuse and pools.get(address):
+            return pools[address].pop(), True
+    try:
+        connection = socket.create_connection(address, timeout)
+    except OSError as error:
+        sys.exit(f'  ERROR: in getconnection, cannot connect to remote player at {address[0]}:{address[1]} ({error})')
+    connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)  # moves are small, so send them at once
+
+    return connection, False
+
+
+def receive(connection, deadline=None):
+    '''Returns the next message from a connection, or None if the connection was closed first. Raises
+    socket.timeout if the whole message has not arrived by the deadline (from time.monotonic), and
+    ValueError if the connection was closed (or reset) in the middle of the message.'''
+    header = receiveexactly(connection, 4, deadline)
+    if header is None:
+        return None
+    try:
+        body = receiveexactly(connection, struct.unpack('>I', header)[0], deadline)
+    except ConnectionError:
+        body = None
+    if body is None:
+        raise ValueError('connection closed in the middle of a message')
+
+    return json.loads(body)
+
+
+def receiveexactly(connection, size, deadline=None):
+    '''Returns exactly size bytes from a connection, or None if the connection was closed first.'''
+    data = b''
+    while len(data) < size:
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise socket.timeout()
+            connection.settimeout(remaining)
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+
+    return data
+
+
+def send(connection, message):
+    '''Send a message (any JSON object) on a connection.'''
+    body = json.dumps(message, separators=(',', ':')).encode()
+    connection.sendall(struct.pack('>I', len(body)) + body)
+
+
+if __name__ == "__main__":
+    main(parser.parse_args())
@@ -0,0 +1,94 @@
+# replay.py
+# A viewer for reviewing a recorded game of Hand of the King (see the --record option in hotk.py).
+# The whole game is simulated once when it is loaded, and a full copy of the game state is kept every
+# k moves (a keyframe). Jumping to any move, forward or backward, then only requires copying the
+# nearest earlier keyframe and replaying fewer than k moves, and the cards already on the screen are
+# recolored in place rather than drawn again.
+#
+# Controls: Right/Left = next/previous move, Up/Down = forward/back k moves, Home/End = first/last
+# move, Escape = quit
+
+import argparse
+from copy import deepcopy
+from dashboard import BACKGROUND, redraw
+from graphics import *
+from hand_of_the_king import gamesetup, loadcolors, status
+import hotk
+
+parser = argparse.ArgumentParser(description="Replay a recorded Game of Thrones: Hand of the King!")
+parser.add_argument('game', metavar='file', type=str, help="file containing a recorded game")
+parser.add_argument('-k', '--keyframe', metavar='k', type=int, help="number of moves in between keyframes", default=8)
+
+
+def main(args):
+    # Load the game and index its states
+    board, moves = hotk.loadgame(args.game)
+    keyframes = buildkeyframes(board, moves, args.keyframe)
+
+    # Make the gui, drawing cards once and recoloring them from then on
+    gui = gamesetup(board)
+    gui.setBackground(BACKGROUND)
+    gui.autoflush = False
+    cells = gui.items[:-1]
+    drawn = board.copy()  # board as currently displayed
+    colors = loadcolors()
+
+    # Step through the game based on keyboard input
+    current = None
+    target = 0
+    while not gui.isClosed():
+        # Show the target move, if it is not already showing
+        target = max(0, min(len(moves), target))
+        if target != current:
+            current = target
+            state = seek(keyframes, moves, args.keyframe, current)
+            redraw(cells, drawn, state['board'], colors)
+            banners = state['banners']
+            status(gui, f"Move {current} of {len(moves)}, Score: {sum(banners[0])}-{sum(banners[1])}")
+        update(30)
+
+        # Check for keyboard input
+        key = gui.checkKey()
+        if key == "Right":
+            target = current + 1
+        elif key == "Left":
+            target = current - 1
+        elif key == "Up":
+            target = current + args.keyframe
+        elif key == "Down":
+            target = current - args.keyframe
+        elif key == "Home":
+            target = 0
+        elif key == "End":
+            target = len(moves)
+        elif key == "Escape" or key == "Ctrl+e":  # exit replay
+            break
+
+    gui.close()
+
+
+def buildkeyframes(board, moves, k):
+    '''Simulate a recorded game, returning a copy of the game state after every k moves.'''
+    state = hotk.newgame(board.copy())
+    keyframes = [deepcopy(state)]
+    for i in range(len(moves)):
+        hotk.makemove(state, i % 2, moves[i])  # players alternate turns, starting with player 1
+        state['moves'] += 1
+        if state['moves'] % k == 0:
+            keyframes.append(deepcopy(state))
+
+    return keyframes
+
+
+def seek(keyframes, moves, k, move):
+    '''Returns the game state after the given number of moves, starting from the closest keyframe.'''
+    state = deepcopy(keyframes[move // k])
+    for i in range(state['moves'], move):
+        hotk.makemove(state, i % 2, moves[i])
+        state['moves'] += 1
+
+    return state
+
+
+if __name__ == "__main__":
+    main(parser.parse_args())
@@ -0,0 +1,153 @@
+# stats.py
+# Summarize a stream of game records (see the --output option in hotk.py) without keeping the games in
+# memory. Each record updates running totals for its pairing of players (wins, losses, wins by tiebreaker
+# and the mean banner margin), so a summary can be printed at any point: every n games, at the end of the
+# stream, or while following a file that is still being written. Since a game cannot end in a draw, the
+# draws are always 0, but they are shown for comparison with other games.
+#
+# The summary includes a Wilson confidence interval for the win rate of each pairing, and a rating for
+# every player from a Bradley-Terry model (on the Elo scale, with the mean rating at 0), fitted to the
+# number of wins in each pairing. The fit starts from the previous ratings, so it only takes a few
+# iterations each time the summary is updated.
+
+import argparse
+import csv
+import json
+import math
+import statistics
+import sys
+import time
+
+parser = argparse.ArgumentParser(description="Summarize the results of many games of Game of Thrones: Hand of the King.")
+parser.add_argument('file', metavar='file', type=str, nargs='?', help="file of game records (JSON lines, or CSV for .csv), or stdin if not given", default=None)
+parser.add_argument('-e', '--every', metavar='n', type=int, help="print a summary every n games (as well as at the end)", default=None)
+parser.add_argument('-f', '--follow', action="store_true", help="flag to keep reading records as they are added to the file (like tail -f)")
+parser.add_argument('-c', '--confidence', metavar='p', type=float, help="confidence level of the intervals", default=0.95)
+
+
+class Statistics:
+    '''Running statistics of a stream of game records, for every pairing of players.'''
+
+    def __init__(self, confidence=0.95):
+        self.confidence = confidence
+        self.games = 0
+        self.pairings = {}  # totals for each pairing, keyed by the players' names (in alphabetical order)
+        self.ratings = {}  # Bradley-Terry strength of each player (see rate)
+
+    def add(self, record):
+        '''Update the statistics with the record of one game.'''
+        names = tuple(sorted([record['player1'], record['player2']]))
+        pairing = self.pairings.setdefault(names, {'wins': 0, 'losses': 0, 'tiebreakers': 0, 'margin': 0})
+        margin = int(record['score1']) - int(record['score2'])  # banners won by player 1 minus player 2
+        if record['player1'] != names[0]:
+            margin = -margin
+
+        # Keep the totals from the point of view of the first player in the pairing
+        if record['winner'] == names[0]:
+            pairing['wins'] += 1
+        else:
+            pairing['losses'] += 1
+        pairing['tiebreakers'] += str(record['tiebreaker']) in ('True', 'true', '1')
+        games = pairing['wins'] + pairing['losses']
+        pairing['margin'] += (margin - pairing['margin']) / games  # running mean
+        self.games += 1
+
+    def rate(self, iterations=20):
+        '''Update the rating of each player, returning them on the Elo scale. The Bradley-Terry model is
+        fitted with the usual MM algorithm, counting one extra draw (half a win each) in every pairing
+        so that a player who has never lost does not get an infinite rating.'''
+        names = sorted({name for pairing in self.pairings for name in pairing})
+        strengths = {name: self.ratings.get(name, 1) for name in names}
+        for i in range(iterations):
+            for name in names:
+                wins = 0
+                total = 0
+                for (first, second), pairing in self.pairings.items():
+                    if name in (first, second):
+                        opponent = second if name == first else first
+                        wins += (pairing['wins'] if name == first else pairing['losses']) + 0.5
+                        total += (pairing['wins'] + pairing['losses'] + 1) / (strengths[name] + strengths[opponent])
+                strengths[name] = wins / total
+
+            # Keep the mean rating at 0 (the geometric mean of the strengths at 1)
+            scale = math.exp(statistics.fmean(math.log(strength) for strength in strengths.values()))
+            strengths = {name: strength / scale for name, strength in strengths.items()}
+        self.ratings = strengths
+
+        return {name: 400 * math.log10(strength) for name, strength in strengths.items()}
+
+    def summary(self):
+        '''Returns a summary of the statistics so far, as a string.'''
+        lines = [f"Games: {self.games}"]
+        for (first, second), pairing in sorted(self.pairings.items()):
+            wins, losses = pairing['wins'], pairing['losses']
+            low, high = wilson(wins, wins + losses, self.confidence)
+            lines.append(f"  {first} vs {second}: {wins}-0-{losses} (W-D-L), {pairing['tiebreakers']} by tiebreaker, "
+                         f"win rate {wins / (wins + losses):.3f} ({self.confidence:.0%} confidence: {low:.3f} to {high:.3f}), "
+                         f"mean margin {pairing['margin']:+.2f}")
+        lines.append("Ratings (Elo):")
+        for name, rating in sorted(self.rate().items(), key=lambda item: -item[1]):
+            lines.append(f"  {name}: {rating:+.1f}")
+
+        return '\n'.join(lines)
+
+
+def main(args):
+    f = open(args.file, 'r', newline='') if args.file else sys.stdin
+    stats = Statistics(args.confidence)
+    try:
+        for record in readrecords(f, args.follow, args.file is not None and args.file.endswith('.csv')):
+            stats.add(record)
+            if args.every and stats.games % args.every == 0:
+                print(stats.summary(), flush=True)
+    except KeyboardInterrupt:  # stop following the file
+        pass
+    if stats.games and not (args.every and stats.games % args.every == 0):
+        print(stats.summary())
+
+
+def parse(line, header=None, iscsv=False):
+    '''Returns the record in a line of JSON or (with a header) a row of CSV.'''
+    if iscsv:
+        return dict(zip(header, next(csv.reader([line]))))
+
+    return json.loads(line)
+
+
+def readrecords(f, follow=False, iscsv=False):
+    '''Yields the records in an open file, one at a time. If follow is True, keep waiting for more records
+    at the end of the file (until interrupted).'''
+    header = None
+    pending = ''  # a line that is still being written
+    while True:
+        pending += f.readline()
+        if not pending.endswith('\n'):  # the end of the file (for now)
+            if not follow:
+                break
+            time.sleep(0.5)
+            continue
+        line, pending = pending, ''
+        if not line.strip():
+            continue
+        if iscsv and header is None:
+            header = next(csv.reader([line]))
+            continue
+        yield parse(line, header, iscsv)
+    if pending.strip():
+        yield parse(pending, header, iscsv)
+
+
+def wilson(wins, games, confidence=0.95):
+    '''Returns the lower and upper limits of the Wilson score interval for a win rate.'''
+    if games == 0:
+        return 0, 1
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    rate = wins / games
+    center = (rate + z ** 2 / (2 * games)) / (1 + z ** 2 / games)
+    spread = z / (1 + z ** 2 / games) * math.sqrt(rate * (1 - rate) / games + z ** 2 / (4 * games ** 2))
+
+    return max(center - spread, 0), min(center + spread, 1)
+
+
+if __name__ == "__main__":
+    main(parser.parse_args())
@@ -0,0 +1,202 @@
+# suite.py
+# A fixed suite of test positions of Hand of the King, for measuring how well and how fast search players
+# solve them, instead of playing whole random games. A suite file has one position per line, as JSON:
+#   {"board": [36 cards], "cards": [[7], [7]], "banners": [[7], [7]], "moves": n, "player": 0 or 1,
+#    "value": 1, "best": [moves]}
+# where moves is the number of moves played so far, player is the side to move, value is the outcome of
+# the position with perfect play for the side to move (1 for a win, -1 for a loss), and best is the list
+# of moves that keep that outcome. A player solves a position if the move it chooses is one of the best.
+#
+# Running this file with --generate makes a suite from random games: each game is played at random until
+# at most the given number of cards are left, and then the position is searched to the end of the game
+# (by players/amelia.py) to find its value and best moves. Only positions that can be won, but not with
+# every move, are kept, since any move solves the others.
+#
+# Otherwise, each player is given every position of a suite, and the report gives, for each player, the
+# number of positions solved, with the time and the positions searched (for players that count them in a
+# module-level nodes variable) in total and to solve each position. Only players with a search function
+# (like amelia and minimax) can be measured, and they are measured through that function instead of
+# get_computer_move, so that pondering, the opening book and random early moves play no part. Every
+# position is searched from an empty transposition table (for players that keep one in a module-level
+# table), so that the results do not depend on the order of the positions. With --baseline, the results
+# are compared with a baseline saved earlier (with --save), and every position that is no longer solved,
+# or that took more positions to search, is reported as a regression. Positions are matched by their
+# encoding (see codec.py), so a baseline still applies after the suite file is reordered.
+
+import argparse
+import codec
+import contextlib
+from copy import deepcopy
+import hotk
+import json
+from match import gameseed
+import math
+import os
+from players import amelia
+import sys
+import time
+
+parser = argparse.ArgumentParser(description="Measure how well search players solve a suite of test positions of Game of Thrones: Hand of the King.")
+parser.add_argument('suite', metavar='file', type=str, help="file containing the suite of positions (as JSON lines)")
+parser.add_argument('-p', '--players', nargs='+', metavar='name', type=str, help="AI players to measure", default=['players/amelia.py'])
+parser.add_argument('-b', '--baseline', metavar='file', type=str, help="file containing results to compare with (see --save)", default=None)
+parser.add_argument('--save', metavar='file', type=str, help="file in which to save the results, as a baseline for later runs", default=None)
+parser.add_argument('-g', '--generate', metavar='n', type=int, help="generate a suite with n positions (saved to the suite file) instead", default=None)
+parser.add_argument('-c', '--cards', metavar='n', type=int, help="number of cards left in generated positions (at most)", default=12)
+parser.add_argument('-s', '--seed', metavar='n', type=int, help="master seed for random number generator (each game gets its own seed from it)", default=0)
+
+
+def main(args):
+    if args.generate:
+        positions = generate(args.generate, args.cards, args.seed)
+        with open(args.suite, 'w') as f:
+            for position in positions:
+                f.write(json.dumps(position) + '\n')
+        print(f"Saved {len(positions)} positions to {args.suite}")
+        return
+
+    # Give every position to each player
+    positions = loadsuite(args.suite)
+    results = {}
+    for player in args.players:
+        name = os.path.splitext(os.path.basename(player))[0]
+        module = hotk.loadplayers([player, player])[0]['module']
+        if not hasattr(module, 'search'):
+            sys.exit(f"  ERROR: in main, {player} has no search function to measure (like players/amelia.py)")
+        results[name] = {getid(position): solve(module, position) for position in positions}
+
+    # Report the results of each player, and any regressions from the baseline
+    baseline = loadjson(args.baseline) if args.baseline else {}
+    regressions = 0
+    for name, result in results.items():
+        print(report(name, result))
+        for line in compare(result, baseline.get(name, {})):
+            print(f"  REGRESSION: {line}")
+            regressions += 1
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=1)
+    if regressions:
+        sys.exit(f"  ERROR: in main, {regressions} regressions from the baseline ({args.baseline})")
+
+
+def compare(result, baseline):
+    '''Returns a description of every regression in the results of a player from its baseline: a
+    position that is no longer solved, or that takes more positions to search.'''
+    regressions = []
+    for key, before in baseline.items():
+        after = result.get(key)
+        if after is None:
+            continue  # not in this suite
+        if before['solved'] and not after['solved']:
+            regressions.append(f"position {key} is no longer solved (played {after['move']})")
+        elif before['nodes'] is not None and after['nodes'] is not None and after['nodes'] > before['nodes']:
+            regressions.append(f"position {key} searched {after['nodes']} positions instead of {before['nodes']}")
+
+    return regressions
+
+
+def generate(n, cards, seed):
+    '''Returns a suite of n positions from random games, each with at most the given number of cards left,
+    with their values and best moves found by searching to the end of the game.'''
+    positions = []
+    i = 0
+    while len(positions) < n:
+        # Play randomly until few enough cards are left (or the game ends)
+        state, player = hotk.randomposition(gameseed(seed, i), cards=cards)
+        i += 1
+        moves = hotk.getvalidmoves(state)
+        if not moves:
+            continue
+
+        # Search every move to the end of the game (every move captures a card), which gives +/-WIN
+        amelia.table = {}
+        evaluation = amelia.Evaluation(state)
+        values = {move: amelia.minval(state, evaluation, player, move, -math.inf, math.inf, cards + 1) for move in moves}
+        best = [move for move in moves if values[move] == amelia.WIN]
+        if 0 < len(best) < len(moves):
+            positions.append({
+                'board': state['board'],
+                'cards': state['cards'],
+                'banners': state['banners'],
+                'moves': state['moves'],
+                'player': player,
+                'value': 1,
+                'best': best})
+
+    return positions
+
+
+def getid(position):
+    '''Returns the key of a position in the results: its encoding (see codec.encode), as hexadecimal,
+    followed by the side to move.'''
+    return codec.encode(position).hex() + str(position['player'])
+
+
+def loadjson(file):
+    '''Load results saved with --save.'''
+    with open(file, 'r') as f:
+        return json.load(f)
+
+
+def loadsuite(file):
+    '''Load the positions of a suite file, checking that each one has what the runner needs.'''
+    positions = []
+    with open(file, 'r') as f:
+        for i, line in enumerate(f):
+            if line.strip():
+                position = json.loads(line)
+                if not {'board', 'cards', 'banners', 'player', 'best'} <= set(position):
+                    sys.exit(f"  ERROR: in loadsuite, position on line {i + 1} of {file} needs board, cards, banners, player and best")
+                positions.append(position)
+
+    return positions
+
+
+def report(name, result):
+    '''Returns a summary of the results of a player on a suite.'''
+    solved = [outcome for outcome in result.values() if outcome['solved']]
+    seconds = sum(outcome['seconds'] for outcome in result.values())
+    line = f"{name}: solved {len(solved)} of {len(result)} positions, {seconds:.3f} s"
+    if solved:
+        line += f" ({sum(outcome['seconds'] for outcome in solved) / len(solved) * 1000:.1f} ms per position solved)"
+    if all(outcome['nodes'] is not None for outcome in result.values()):
+        line += f", {sum(outcome['nodes'] for outcome in result.values())} positions searched"
+        if solved:
+            line += f" ({sum(outcome['nodes'] for outcome in solved) / len(solved):.0f} per position solved)"
+
+    return line
+
+
+def solve(module, position):
+    '''Returns the move an AI player (with a search function) chooses in a position from a suite, whether
+    it is one of the best moves, and the time and positions searched (if the player counts them) to choose
+    it.'''
+    state = hotk.newgame(position['board'].copy())
+    state['cards'] = deepcopy(position['cards'])
+    state['banners'] = deepcopy(position['banners'])
+    state['moves'] = position.get('moves', 0)
+
+    # Search from an empty table (putting the player's own table back afterwards)
+    table = getattr(module, 'table', None)
+    if table is not None:
+        module.table = {}
+    nodes = getattr(module, 'nodes', None)
+    began = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(sys.stderr):  # keep anything printed by the player out of the report
+            move = module.search(state, position['player'])
+    finally:
+        if table is not None:
+            module.table = table
+    seconds = time.perf_counter() - began
+
+    return {
+        'move': move,
+        'solved': move in position['best'],
+        'seconds': seconds,
+        'nodes': module.nodes - nodes if nodes is not None else None}
+
+
+if __name__ == "__main__":
+    main(parser.parse_args())
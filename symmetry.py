@@ -0,0 +1,62 @@
+# symmetry.py
+# The rules of Hand of the King do not change if the (square) board is rotated or reflected, so each
+# position has up to 8 equivalent versions: 4 rotations, each with or without a reflection. This module
+# maps a board to its canonical version (the smallest of the 8, when compared as tuples), so that caches
+# and stored positions can be shared between equivalent positions. The transform that was used is also
+# returned, so that a move found for the canonical board can be mapped back to the original board.
+#
+# The transforms are stored as permutation tables: transformed board[i] = board[PERMUTATIONS[t][i]].
+
+from hotk import COLS, ROWS
+import operator
+
+N = ROWS  # the board must be square (ROWS == COLS)
+
+# Position (row, col) in each transformed board comes from the position given by these functions
+SOURCES = [
+    lambda row, col: (row, col),  # identity
+    lambda row, col: (N - 1 - col, row),  # rotate 90 degrees clockwise
+    lambda row, col: (N - 1 - row, N - 1 - col),  # rotate 180 degrees
+    lambda row, col: (col, N - 1 - row),  # rotate 270 degrees clockwise
+    lambda row, col: (row, N - 1 - col),  # reflect left to right
+    lambda row, col: (N - 1 - row, col),  # reflect top to bottom
+    lambda row, col: (col, row),  # reflect across the main diagonal
+    lambda row, col: (N - 1 - col, N - 1 - row)]  # reflect across the other diagonal
+
+PERMUTATIONS = [tuple(COLS * row + col for row, col in (source(i // COLS, i % COLS) for i in range(ROWS * COLS))) for source in SOURCES]
+INVERSES = [tuple(permutation.index(i) for i in range(ROWS * COLS)) for permutation in PERMUTATIONS]
+GETTERS = [operator.itemgetter(*permutation) for permutation in PERMUTATIONS]  # fast way to apply each permutation
+
+
+def canonical(board):
+    '''Returns the canonical version of a board (as a tuple) and the index of the transform that produces it.'''
+    images = [getter(board) for getter in GETTERS]
+    t = min(range(len(images)), key=images.__getitem__)
+
+    return images[t], t
+
+
+def getcanonicalkey(state):
+    '''Returns the same representation of a position as hotk.getkey, except with the canonical version
+    of the board, along with the index of the transform that produces it.'''
+    board, t = canonical(state['board'])
+    key = (board,
+           tuple(state['cards'][0]), tuple(state['cards'][1]),
+           tuple(state['banners'][0]), tuple(state['banners'][1]))
+
+    return key, t
+
+
+def tocanonical(move, t):
+    '''Returns the index in the transformed board of a move (index) in the original board.'''
+    return INVERSES[t][move]
+
+
+def tooriginal(move, t):
+    '''Returns the index in the original board of a move (index) in the transformed board.'''
+    return PERMUTATIONS[t][move]
+
+
+def transform(board, t):
+    '''Returns a list containing the board after applying transform t.'''
+    return list(GETTERS[t](board))
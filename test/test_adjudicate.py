@@ -0,0 +1,22 @@
+# test_adjudicate.py
+# Testing that a game ended early by adjudication (see hotk.isdecided) has the same result as the full
+# playout of the same game.
+
+import hotk
+import random
+
+
+def test_adjudicate():
+    ai = hotk.loadplayers(['players/randy.py', 'players/randy.py'])
+    for seed in range(300):
+        random.seed(seed)
+        board = hotk.dealcards(hotk.HOUSES)
+        results = []
+        for adjudicate in [False, True]:
+            random.seed(seed)  # so that the moves are the same, up to the end of the shorter game
+            results.append(hotk.playgame(ai, board.copy(), adjudicate=adjudicate))
+        (full, moves), (adjudicated, history) = results
+        assert history == moves[:len(history)]
+        assert hotk.isdecided(adjudicated) or len(history) == len(moves)  # or the game simply ended
+        assert hotk.whowins(adjudicated, ai) == hotk.whowins(full, ai)
+        assert adjudicated['banners'] == full['banners']
@@ -0,0 +1,44 @@
+# test_batched.py
+# Testing that batched mode in amelia.py chooses the same moves as the ordinary search, and that table
+# entries are not reused after the settings they depend on change.
+
+from copy import deepcopy
+import hotk
+from players import amelia
+
+
+def positions(n):
+    '''Returns n positions (and the player to move) from seeded random games.'''
+    found = [hotk.randomposition(seed) for seed in range(2 * n)]
+
+    return [(state, player) for state, player in found if hotk.getvalidmoves(state)][:n]
+
+
+def test_batched():
+    depth, batched, table = amelia.DLSmax, amelia.BATCHED, amelia.table
+    try:
+        amelia.DLSmax = 4
+        for state, player in positions(40):
+            moves = []
+            for amelia.BATCHED in [False, True]:
+                amelia.table = {}
+                moves.append(amelia.search(deepcopy(state), player))
+            assert moves[0] == moves[1]
+    finally:
+        amelia.DLSmax, amelia.BATCHED, amelia.table = depth, batched, table
+
+
+def test_settings():
+    depth, weights, table = amelia.DLSmax, amelia.WEIGHTS, amelia.table
+    try:
+        amelia.DLSmax = 3
+        for state, player in positions(20):
+            # A search after changing the weights is the same as a search with an empty table
+            amelia.WEIGHTS, amelia.table = [1, 3, 10], {}
+            amelia.search(deepcopy(state), player)
+            amelia.WEIGHTS = [5, 1, 0]
+            stale = amelia.search(deepcopy(state), player), len(amelia.table)
+            amelia.table = {}
+            assert stale == (amelia.search(deepcopy(state), player), len(amelia.table))
+    finally:
+        amelia.DLSmax, amelia.WEIGHTS, amelia.table = depth, weights, table
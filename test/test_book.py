@@ -0,0 +1,29 @@
+# test_book.py
+# Testing that an opening book built by book.py answers every position in its opening, in any rotation
+# or reflection of the board, with the move that the search found (or its equivalent).
+
+import book
+import hotk
+from players import amelia
+import symmetry
+
+
+def test_book(tmp_path):
+    depth = amelia.DLSmax
+    usebook = amelia.BOOK
+    try:
+        book.loadworker(2)
+        file = str(tmp_path / 'book.bin')
+        positions = book.getopening([hotk.loadcards('board0.txt')], 2)
+        book.savebook(file, dict(book.searchposition(item) for item in positions.items()))
+
+        opening = book.Book(file)
+        for key, (state, player) in positions.items():
+            assert opening.probe(state, player) == amelia.search(state, player)
+            for t in range(8):
+                transformed = dict(state, board=symmetry.transform(state['board'], t))
+                assert opening.probe(transformed, player) in hotk.getvalidmoves(transformed)
+        assert opening.probe(hotk.newgame(hotk.loadcards('board1.txt')), 0) is None
+    finally:
+        amelia.DLSmax = depth
+        amelia.BOOK = usebook
@@ -0,0 +1,28 @@
+# test_cache.py
+# Testing that the key of a game in the cache (see hotk.getcachekey) covers the modules and data files
+# that the players use, so that changing any of them never reuses an old result.
+
+import hotk
+from players import amelia
+
+
+def test_getcachekey(tmp_path):
+    data = amelia.DATA
+    try:
+        ai = hotk.loadplayers(['players/amelia.py', 'players/randy.py'])
+        files = [file.replace('\\', '/') for file in hotk.getsources([hotk] + [player['module'] for player in ai])]
+        for module in ['hotk.py', 'players/amelia.py', 'players/randy.py', 'book.py', 'ponder.py', 'symmetry.py']:
+            assert any(file.endswith('/' + module) for file in files)
+
+        # The key depends on the seed and on the contents of the data files (which may be missing)
+        book = tmp_path / 'book.bin'
+        amelia.DATA = [str(book)]
+        keys = [hotk.getcachekey(ai, None, 1), hotk.getcachekey(ai, None, 1), hotk.getcachekey(ai, None, 2)]
+        book.write_bytes(b'HOTKBOOK')
+        keys.append(hotk.getcachekey(ai, None, 1))
+        book.write_bytes(b'HOTKBOOK' + bytes(9))
+        keys.append(hotk.getcachekey(ai, None, 1))
+        assert keys[0] == keys[1] and len(set(keys)) == 4
+        assert hotk.getcachekey(ai, None, None) is None
+    finally:
+        amelia.DATA = data
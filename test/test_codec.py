@@ -0,0 +1,33 @@
+# test_codec.py
+# Testing that the encodings in codec.py of deals (as ranks) and positions (as bytes) can be reversed.
+
+import codec
+import hotk
+import random
+
+
+def test_rankdeal():
+    random.seed(0)
+    for i in range(1000):
+        board = hotk.dealcards(hotk.HOUSES)
+        assert codec.unrankdeal(codec.rankdeal(board)) == board
+
+    # Ranks follow the lexicographic order of the deals
+    first, last = codec.unrankdeal(0), codec.unrankdeal(codec.DEALS - 1)
+    assert first == sorted(first) and last == sorted(last, reverse=True)
+    assert codec.rankdeal(hotk.loadcards('board0.txt')) == 0
+    boards = [codec.sampledeal() for i in range(50)]
+    assert sorted(boards) == [codec.unrankdeal(rank) for rank in sorted(map(codec.rankdeal, boards))]
+
+
+def test_encode():
+    random.seed(0)
+    for game in range(100):
+        state = hotk.newgame(hotk.dealcards(hotk.HOUSES))
+        player = 0
+        while hotk.getvalidmoves(state):
+            data = codec.encode(state)
+            assert len(data) == codec.SIZE
+            assert hotk.getkey(codec.decode(data)) == hotk.getkey(state)
+            hotk.makemove(state, player, random.choice(hotk.getvalidmoves(state)))
+            player = 1 - player
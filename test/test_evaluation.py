@@ -0,0 +1,20 @@
+# test_evaluation.py
+# Testing that the incremental Evaluation in amelia.py always matches its heuristic.
+
+from copy import deepcopy
+import hotk
+from players import amelia
+
+
+def test_evaluation():
+    for seed in range(500):
+        state = hotk.randomposition(seed, moves=seed % 30)[0]
+
+        # Every move, by either player (not necessarily alternating, to reach more kinds of positions)
+        for move in hotk.getvalidmoves(state):
+            for player in range(2):
+                after = deepcopy(state)
+                evaluation = amelia.Evaluation(after)
+                evaluation.makemove(after, player, move)
+                for p in range(2):
+                    assert evaluation.get(p) == amelia.heuristic(after['cards'], after['banners'], p, abs(p - 1))
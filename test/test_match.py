@@ -0,0 +1,48 @@
+# test_match.py
+# Testing the statistics used by the sequential probability ratio test in match.py, and that the shards of
+# a match merge into the same results as playing it on one machine.
+
+import match
+import math
+
+
+def test_llr():
+    # Equal hypotheses give no evidence either way
+    assert match.llr(30, 10, 0, 0) == 0
+
+    # Wins are evidence for the stronger hypothesis, and losses against it
+    assert match.llr(1, 0, 0, 20) > 0
+    assert match.llr(0, 1, 0, 20) < 0
+
+    # A score that matches H0 exactly favors H0
+    assert match.llr(500, 500, 0, 20) < 0
+
+
+def test_elo():
+    assert match.elo(0.5) == 0
+    assert math.isclose(match.elo(0.75), -match.elo(0.25))
+    assert math.isclose(match.expected(match.elo(0.75)), 0.75)
+    assert match.elo(1) == math.inf
+
+
+def test_pairllr():
+    # Pairs won more often than expected under H1 are evidence for H1
+    assert match.pairllr([1, 0.5, 1, 0.5, 1, 0], 0, 20) > 0
+    assert match.pairllr([0, 0.5, 0, 0.5, 0, 1], 0, 20) < 0
+    assert match.pairllr([0.5, 0.5], 0, 20) == 0
+
+
+def test_merge(tmp_path, capsys):
+    # Merging the shards of a match gives the same games and report as playing it on one machine
+    for paired in [False, True]:
+        options = ['-n', '5', '-s', '1'] + (['--paired'] if paired else [])
+        single = str(tmp_path / 'single.jsonl')
+        match.main(match.parser.parse_args(options + ['-o', single]))
+        report = capsys.readouterr().out
+        shards = [str(tmp_path / f'shard{i}.jsonl') for i in range(6)]
+        for i in range(6):  # the last shard has no games
+            match.main(match.parser.parse_args(options + ['--shard', str(i), '6', '-o', shards[i]]))
+        assert capsys.readouterr().out.endswith(f"No {'pairs' if paired else 'games'} played\n")
+        match.main(match.parser.parse_args(['--merge'] + shards[::-1]))
+        assert capsys.readouterr().out == report
+        assert match.loadshards(shards)[1] == match.loadshards([single])[1]
@@ -0,0 +1,41 @@
+# test_ponder.py
+# Testing that pondering in players/amelia.py finds the same answers as searching directly, and that the
+# table entries it finds are added to amelia's table, even when the actual reply was not searched.
+
+from copy import deepcopy
+import hotk
+from players import amelia
+import random
+
+
+def test_ponder():
+    depth, table = amelia.DLSmax, amelia.table
+    try:
+        amelia.DLSmax = 3
+        amelia.table = {}
+        random.seed(0)
+        state = hotk.newgame(hotk.dealcards(hotk.HOUSES))
+        hotk.makemove(state, 0, hotk.getvalidmoves(state)[0])
+        state['moves'] += 1
+        replies = hotk.getvalidmoves(state)
+
+        # Ponder every reply but the last, and let pondering finish before the opponent replies
+        ponderer = amelia.pondering[0]
+        for reply in [replies[0], replies[-1]]:
+            after = deepcopy(state)
+            hotk.makemove(after, 1, reply)
+            after['moves'] += 1
+            ponderer.start(state, 0, replies[:-1])
+            ponderer.process.join()
+            amelia.table = {}
+            answer = ponderer.answer(after)
+            assert ponderer.process is None
+            if reply == replies[0]:  # searched while pondering, so its whole subtree is in the table
+                assert answer == amelia.search(deepcopy(after), 0)
+                assert len(amelia.table) > 0 and all(hotk.reachable(key[0], after) for key in amelia.table)
+            else:
+                assert answer is None
+                assert all(hotk.reachable(key[0], after) for key in amelia.table)
+    finally:
+        amelia.stoppondering(0)
+        amelia.DLSmax, amelia.table = depth, table
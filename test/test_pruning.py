@@ -0,0 +1,56 @@
+# test_pruning.py
+# Testing that pruning positions whose outcome is decided (see hotk.getbounds) is sound: the bounds hold for
+# every playout, and minimax finds the same utilities as a plain search of the whole game tree.
+
+from copy import deepcopy
+import hotk
+from players import minimax
+import random
+
+
+def outcome(state, player, tomove):
+    '''Returns the outcome (1 for a win, -1 for a loss) for player with perfect play by both sides, without
+    any pruning.'''
+    moves = hotk.getvalidmoves(state)
+    if len(moves) == 0:
+        return 1 if hotk.getwinner(state) == player else -1
+    outcomes = []
+    for move in moves:
+        after = deepcopy(state)
+        hotk.makemove(after, tomove, move)
+        outcomes.append(outcome(after, player, 1 - tomove))
+
+    return max(outcomes) if tomove == player else min(outcomes)
+
+
+def test_getbounds():
+    for seed in range(200):
+        state, player = hotk.randomposition(seed, cards=10)
+        for p in range(2):
+            worst, best = hotk.getbounds(state, p)
+            assert worst <= best
+
+            # Random playouts, and the outcome with perfect play, never fall outside the bounds
+            for playout in range(10):
+                final = deepcopy(state)
+                tomove = player
+                while hotk.getvalidmoves(final):
+                    hotk.makemove(final, tomove, random.choice(hotk.getvalidmoves(final)))
+                    tomove = 1 - tomove
+                assert worst <= (1 if hotk.getwinner(final) == p else -1) <= best
+            if seed < 50:
+                assert worst <= outcome(state, p, player) <= best
+
+
+def test_minimax():
+    table = minimax.table
+    try:
+        for seed in range(50):
+            state, player = hotk.randomposition(seed, cards=8)
+            for move in hotk.getvalidmoves(state):
+                minimax.table = {}
+                after = deepcopy(state)
+                hotk.makemove(after, player, move)
+                assert minimax.minval(state, player, move) == outcome(after, player, 1 - player)
+    finally:
+        minimax.table = table
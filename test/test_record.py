@@ -0,0 +1,44 @@
+# test_record.py
+# Testing that records of games are appended to results files (as JSON lines or CSV), and that a game found
+# in the cache is still appended (and saved with --record) as it was when it was played.
+
+import csv
+import hotk
+import json
+
+
+def test_saverecord(tmp_path):
+    result = hotk.play(['players/randy.py', 'players/randy.py'], seed=1)
+    for name in ['results.jsonl', 'results.csv']:
+        output = str(tmp_path / name)
+        for seed in [1, 2]:
+            hotk.play(['players/randy.py', 'players/randy.py'], seed=seed, output=output)
+        with open(output, newline='') as f:
+            if name.endswith('.csv'):
+                records = list(csv.DictReader(f))
+                assert list(records[0]) == hotk.RECORD
+                assert [record['seed'] for record in records] == ['1', '2']
+                assert len(records[0]['banners1'].split()) == len(hotk.HOUSES)
+            else:
+                records = [json.loads(line) for line in f]
+                assert set(records[0]) == set(hotk.RECORD)
+                assert [record['seed'] for record in records] == [1, 2]
+                assert len(records[0]['banners1']) == len(hotk.HOUSES)
+        assert result.startswith(records[0]['winner'])
+
+
+def test_cachedrecord(tmp_path):
+    cache = str(tmp_path / 'results.db')
+    output = str(tmp_path / 'results.jsonl')
+    files = [str(tmp_path / 'game1.txt'), str(tmp_path / 'game2.txt')]
+    results = [hotk.play(['players/randy.py', 'players/minimax.py'], seed=3, record=file, cache=cache, output=output) for file in files]
+    assert results[0] == results[1]
+    with open(output) as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == 2 and records[0] == records[1]  # the second game came from the cache
+    with open(files[0]) as first, open(files[1]) as second:
+        assert first.read() == second.read()
+
+    # Recorded games (whether played or found in the cache) can still be loaded for replaying
+    board, moves = hotk.loadgame(files[1])
+    assert len(board) == 36 and len(moves) == records[1]['moves']
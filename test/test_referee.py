@@ -0,0 +1,39 @@
+# test_referee.py
+# Testing that referee.py plays the same games as hotk.py, with both coroutine and ordinary players.
+
+import asyncio
+import hotk
+import random
+import referee
+import time
+import types
+
+
+def first(state, whichplayer):
+    return hotk.getvalidmoves(state)[0]
+
+
+async def slowfirst(state, whichplayer):
+    await asyncio.sleep(0.01)  # e.g. waiting for a remote player
+    return hotk.getvalidmoves(state)[0]
+
+
+def test_referee():
+    random.seed(0)
+    boards = [hotk.dealcards(hotk.HOUSES) for i in range(20)]
+    sync = [{'name': 'first', 'module': types.SimpleNamespace(get_computer_move=first)}] * 2
+    slow = [{'name': 'slowfirst', 'module': types.SimpleNamespace(get_computer_move=slowfirst)}] * 2
+
+    # Games between coroutine players wait at the same time, so they take about as long as one game
+    start = time.time()
+    results = asyncio.run(collect([(slow, board.copy()) for board in boards]))
+    assert time.time() - start < 0.01 * 36 * 5
+
+    # Every game ends as it does in hotk.py, whatever order the games finish in
+    expected = sorted(hotk.getkey(hotk.playgame(sync, board.copy())[0]) for board in boards)
+    assert sorted(hotk.getkey(state) for ai, state in results) == expected
+    assert sorted(hotk.getkey(state) for ai, state in asyncio.run(collect([(sync, board.copy()) for board in boards]))) == expected
+
+
+async def collect(games):
+    return [game async for game in referee.playgames(games, 100)]
@@ -0,0 +1,60 @@
+# test_remote.py
+# Testing that a remote player (through the stand-in server in remote.py) plays the same moves as the
+# player it wraps, reusing one connection for every move, and that a move is sent again on a new connection
+# when the server has closed the pooled one.
+
+import hotk
+import random
+import remote
+import socketserver
+import threading
+import types
+
+
+def first(state, whichplayer):
+    return hotk.getvalidmoves(state)[0]
+
+
+def test_remote():
+    server = socketserver.ThreadingTCPServer(('localhost', 0), remote.Handler)
+    server.daemon_threads = True
+    server.player = types.SimpleNamespace(get_computer_move=first)
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        local = {'name': 'first', 'module': server.player}
+        far = {'name': 'remote', 'module': remote.Remote(*server.server_address)}
+        random.seed(0)
+        for game in range(10):
+            board = hotk.dealcards(hotk.HOUSES)
+            assert hotk.playgame([far, local], board.copy())[1] == hotk.playgame([local, local], board.copy())[1]
+        assert len(remote.pools[server.server_address]) == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class Once(remote.Handler):
+    '''A server that closes each connection after one move, like one that restarts or drops idle
+    connections.'''
+
+    def handle(self):
+        request = remote.receive(self.connection)
+        remote.send(self.connection, {'move': first(request['state'], request['player'])})
+
+
+def test_reconnect():
+    server = socketserver.ThreadingTCPServer(('localhost', 0), Once)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    try:
+        local = {'name': 'first', 'module': types.SimpleNamespace(get_computer_move=first)}
+        far = {'name': 'remote', 'module': remote.Remote(*server.server_address)}
+        random.seed(1)
+        board = hotk.dealcards(hotk.HOUSES)
+        assert hotk.playgame([far, local], board.copy())[1] == hotk.playgame([local, local], board.copy())[1]
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,25 @@
+# test_serve.py
+# Testing that the server in hotk.py (--serve) plays valid requests, and rejects requests that name files
+# to write or do not give two players.
+
+import hotk
+import json
+
+
+def test_respond(tmp_path):
+    response = json.loads(hotk.respond('{"id": 7, "players": ["players/randy.py", "players/randy.py"], "seed": 1}'))
+    assert response['id'] == 7 and response['result'] == hotk.play(['players/randy.py', 'players/randy.py'], seed=1)
+
+    for key in ['record', 'cache', 'output']:
+        request = {'players': ['players/randy.py', 'players/randy.py'], key: str(tmp_path / 'file')}
+        assert 'error' in json.loads(hotk.respond(json.dumps(request)))
+    assert not list(tmp_path.iterdir())
+    for players in [['players/randy.py'], ['players/randy.py'] * 3, 'players/randy.py', [1, 2]]:
+        response = json.loads(hotk.respond(json.dumps({'players': players})))
+        assert response['error'] == 'ERROR: in respond, players must be a list of two AI players'
+
+    # The server's own results file applies to every game
+    output = str(tmp_path / 'results.jsonl')
+    hotk.respond('{"players": ["players/randy.py", "players/randy.py"], "seed": 2}', output=output)
+    with open(output) as f:
+        assert json.loads(f.readline())['seed'] == 2
@@ -0,0 +1,34 @@
+# test_stats.py
+# Testing the running statistics in stats.py on a few made-up game records.
+
+import math
+import stats
+
+
+def record(player1, player2, winner, score1, score2):
+    return {'player1': player1, 'player2': player2, 'winner': winner, 'score1': score1, 'score2': score2, 'tiebreaker': score1 == score2}
+
+
+def test_statistics():
+    s = stats.Statistics()
+    s.add(record('b', 'a', 'b', 5, 2))  # seats do not matter
+    s.add(record('a', 'b', 'a', 4, 3))
+    s.add(record('a', 'b', 'b', 3, 3))
+    s.add(record('c', 'a', 'a', 1, 6))
+    assert s.games == 4
+    pairing = s.pairings[('a', 'b')]
+    assert (pairing['wins'], pairing['losses'], pairing['tiebreakers']) == (1, 2, 1)
+    assert math.isclose(pairing['margin'], -2 / 3)
+    assert s.pairings[('a', 'c')]['wins'] == 1
+
+    # a beat c, b beat a, so the ratings are in that order (with a mean of 0)
+    ratings = s.rate()
+    assert ratings['b'] > ratings['a'] > ratings['c']
+    assert math.isclose(sum(ratings.values()), 0, abs_tol=1e-9)
+
+
+def test_wilson():
+    low, high = stats.wilson(50, 100)
+    assert math.isclose(low, 1 - high)
+    assert 0.40 < low < 0.41
+    assert math.isclose(stats.wilson(0, 10)[0], 0, abs_tol=1e-9) and stats.wilson(10, 10)[1] > 0.99
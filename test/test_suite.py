@@ -0,0 +1,46 @@
+# test_suite.py
+# Testing that the test positions generated by suite.py are solved by a full search (by amelia and by
+# minimax), that the runner rejects players it cannot measure, and that it reports positions that are no
+# longer solved (or take more searching) as regressions.
+
+from players import amelia, minimax
+import pytest
+import suite
+
+
+def test_solve():
+    positions = suite.generate(5, 8, seed=1)
+    assert len(positions) == 5
+    depth = amelia.DLSmax
+    try:
+        amelia.DLSmax = 9  # enough to search every position to the end
+        result = {suite.getid(position): suite.solve(amelia, position) for position in positions}
+
+        # Each position is searched from an empty table, so the order of the positions makes no difference
+        reverse = {suite.getid(position): suite.solve(amelia, position) for position in positions[::-1]}
+        assert all(reverse[key]['move'] == outcome['move'] and reverse[key]['nodes'] == outcome['nodes'] for key, outcome in result.items())
+    finally:
+        amelia.DLSmax = depth
+    assert all(outcome['solved'] and outcome['nodes'] > 0 for outcome in result.values())
+    assert suite.compare(result, result) == []
+
+    # A position that is no longer solved, or searched more, is a regression
+    key = next(iter(result))
+    worse = {key: dict(result[key], solved=False)}
+    assert len(suite.compare(worse, result)) == 1
+    slower = {key: dict(result[key], nodes=result[key]['nodes'] + 1)}
+    assert len(suite.compare(slower, result)) == 1
+    assert suite.compare(result, {'missing': result[key]}) == []
+
+
+def test_players(tmp_path):
+    # minimax is measured through its search, which solves every position (not its random early moves)
+    positions = suite.generate(3, 8, seed=2)
+    result = [suite.solve(minimax, position) for position in positions]
+    assert all(outcome['solved'] and outcome['nodes'] > 0 for outcome in result)
+
+    # Players without a search function cannot be measured
+    file = tmp_path / 'suite.jsonl'
+    suite.main(suite.parser.parse_args([str(file), '--generate', '1', '--cards', '8']))
+    with pytest.raises(SystemExit, match='no search function'):
+        suite.main(suite.parser.parse_args([str(file), '-p', 'players/randy.py']))
@@ -0,0 +1,37 @@
+# test_symmetry.py
+# Testing that rotating or reflecting the board does not change the game (see symmetry.py).
+
+import hotk
+import symmetry
+
+
+def test_permutations():
+    for permutation, inverse in zip(symmetry.PERMUTATIONS, symmetry.INVERSES):
+        assert sorted(permutation) == list(range(hotk.ROWS * hotk.COLS))
+        assert [permutation[i] for i in inverse] == list(range(hotk.ROWS * hotk.COLS))
+    assert len(set(symmetry.PERMUTATIONS)) == 8
+
+
+def test_canonical():
+    for seed in range(50):
+        board = hotk.randomposition(seed)[0]['board']
+        canonical, t = symmetry.canonical(board)
+        assert list(canonical) == symmetry.transform(board, t)
+        for u in range(8):  # every equivalent board has the same canonical version
+            assert symmetry.canonical(symmetry.transform(board, u))[0] == canonical
+
+
+def test_moves():
+    for seed in range(50):
+        state = hotk.randomposition(seed)[0]
+        for t in range(8):
+            image = hotk.newgame(symmetry.transform(state['board'], t))
+            moves = hotk.getvalidmoves(state)
+            assert sorted(hotk.getvalidmoves(image)) == sorted(symmetry.tocanonical(move, t) for move in moves)
+            for move in moves:  # making a move and then transforming is the same as the other way around
+                before, after = hotk.newgame(image['board'].copy()), hotk.newgame(state['board'].copy())
+                hotk.makemove(before, 0, symmetry.tocanonical(move, t))
+                hotk.makemove(after, 0, move)
+                assert before['board'] == symmetry.transform(after['board'], t)
+                assert before['cards'] == after['cards']
+                assert symmetry.tooriginal(symmetry.tocanonical(move, t), t) == move
@@ -0,0 +1,29 @@
+# test_table.py
+# Testing that amelia.py chooses the same moves when it keeps its transposition table between moves as
+# when it searches every position from an empty table.
+
+from copy import deepcopy
+import hotk
+from players import amelia
+import random
+
+
+def test_table():
+    depth, table = amelia.DLSmax, amelia.table
+    try:
+        amelia.DLSmax = 4
+        random.seed(0)
+        for game in range(3):
+            kept = {}
+            state = hotk.newgame(hotk.dealcards(hotk.HOUSES))
+            player = 0
+            while hotk.getvalidmoves(state):
+                amelia.table = kept
+                move = amelia.search(deepcopy(state), player)
+                amelia.table = {}
+                assert amelia.search(deepcopy(state), player) == move
+                hotk.makemove(state, player, move)
+                state['moves'] += 1
+                player = 1 - player
+    finally:
+        amelia.DLSmax, amelia.table = depth, table
@@ -0,0 +1,141 @@
+# tune.py
+# Tune the weights of the heuristic used by players/amelia.py (see WEIGHTS) by self-play. The weights are
+# tuned with SPSA (simultaneous perturbation stochastic approximation): in each iteration, every weight is
+# nudged up or down at random, and a player using the nudged weights plays a player using the opposite
+# nudge. The weights then move in the direction of whichever did better. The weight for each card is
+# fixed at 1 (it sets the scale of the heuristic), so only the weights for banners and secured banners
+# are tuned.
+#
+# The games of each iteration are played in parallel by a pool of worker processes, using the rules in
+# hotk.py. Each game is played twice on the same (seeded) board, with the players swapping seats, so that
+# an unlucky deal does not count for or against either set of weights. After every iteration, the weights
+# (and everything needed to continue the run) are saved to a checkpoint file, so a long run can be stopped
+# and resumed later with the same command.
+
+import argparse
+import hotk
+import json
+import multiprocessing
+import os
+from players import amelia
+import random
+import sys
+
+LIMITS = (0, 50)  # range of each tuned weight (which keeps the heuristic well below amelia.WIN)
+
+parser = argparse.ArgumentParser(description="Tune the heuristic weights of players/amelia.py by self-play.")
+parser.add_argument('-n', '--iterations', metavar='n', type=int, help="number of iterations to run (in total, including resumed ones)", default=100)
+parser.add_argument('-g', '--pairs', metavar='n', type=int, help="number of pairs of games (with seats swapped) played in each iteration", default=8)
+parser.add_argument('-w', '--workers', metavar='n', type=int, help="number of worker processes", default=multiprocessing.cpu_count())
+parser.add_argument('-d', '--depth', metavar='n', type=int, help="depth limit of amelia's search during tuning", default=3)
+parser.add_argument('-s', '--seed', metavar='n', type=int, help="seed for random number generator (for repeatability)", default=None)
+parser.add_argument('-c', '--checkpoint', metavar='file', type=str, help="file in which to save progress (resumed if it exists)", default='tune.json')
+parser.add_argument('-o', '--output', metavar='file', type=str, help="file in which to save the tuned weights", default='weights.json')
+parser.add_argument('--step', metavar='a', type=float, help="SPSA step size", default=20)
+parser.add_argument('--perturbation', metavar='c', type=float, help="SPSA perturbation size", default=2)
+
+
+class Tuned:
+    '''An AI player that uses amelia's search with its own weights (and its own transposition table). The
+    opening book and pondering are not used, since their moves do not depend on the weights.'''
+
+    def __init__(self, weights):
+        self.weights = weights
+        self.table = {}  # results depend on the weights, so they cannot be shared with another player
+
+    def get_computer_move(self, state, whichplayer):
+        amelia.WEIGHTS = self.weights
+        amelia.table = self.table
+
+        return amelia.search(state, whichplayer)
+
+
+def main(args):
+    # Start a new run, or resume a previous one
+    if os.path.exists(args.checkpoint):
+        run = loadjson(args.checkpoint)
+        print(f"Resuming from {args.checkpoint} at iteration {run['iteration']}")
+    else:
+        run = {
+            'seed': args.seed if args.seed is not None else random.randrange(2 ** 32),
+            'iteration': 0,
+            'weights': amelia.WEIGHTS[1:],  # tuned weights (the weight for each card is fixed)
+            'history': []}
+
+    # Run the remaining iterations, saving progress after each one
+    with multiprocessing.Pool(args.workers, initializer=setdepth, initargs=(args.depth,)) as pool:
+        while run['iteration'] < args.iterations:
+            k = run['iteration']
+            a = args.step / (k + 1 + args.iterations / 10) ** 0.602  # standard SPSA gain sequences
+            c = args.perturbation / (k + 1) ** 0.101
+
+            # Nudge every weight up or down at random
+            rng = random.Random(f"{run['seed']}:{k}")  # each iteration has its own random stream
+            delta = [rng.choice([-1, 1]) for w in run['weights']]
+            plus = [1] + [clip(w + c * d) for w, d in zip(run['weights'], delta)]
+            minus = [1] + [clip(w - c * d) for w, d in zip(run['weights'], delta)]
+
+            # Play the nudged weights against each other
+            seeds = [rng.randrange(2 ** 32) for i in range(args.pairs)]
+            score = sum(pool.starmap(playpair, [(plus, minus, seed) for seed in seeds])) / (2 * args.pairs)
+
+            # Move the weights towards the better nudge
+            run['weights'] = [clip(w + a * score / (2 * c) * d) for w, d in zip(run['weights'], delta)]
+            run['iteration'] += 1
+            run['history'].append({'score': score, 'weights': run['weights']})
+            print(f"Iteration {run['iteration']}: score = {score:+.3f}, weights = {describe([1] + run['weights'])}")
+
+            savejson(args.checkpoint, run)
+            savejson(args.output, [1] + run['weights'])
+
+    print(f"Tuned weights: {describe([1] + run['weights'])} (saved to {args.output})")
+
+
+def clip(weight):
+    '''Returns the weight, limited to the range allowed for tuned weights.'''
+    return min(max(weight, LIMITS[0]), LIMITS[1])
+
+
+def describe(weights):
+    '''Returns the weights as a string, rounded for display.'''
+    return '[' + ', '.join(f'{w:.2f}' for w in weights) + ']'
+
+
+def loadjson(file):
+    '''Load data from a JSON file.'''
+    try:
+        with open(file, 'r') as f:
+            return json.load(f)
+    except ValueError:
+        sys.exit(f'  ERROR: in loadjson, cannot read file ({file})')
+
+
+def playpair(plus, minus, seed):
+    '''Play two games on the same board, with each set of weights taking a turn as player 1. Returns the
+    number of wins for plus minus the number of wins for minus (-2, 0 or 2).'''
+    random.seed(seed)
+    board = hotk.dealcards(hotk.HOUSES)
+
+    score = 0
+    for first in range(2):
+        weights = [plus, minus] if first == 0 else [minus, plus]
+        ai = [{'name': f'player{i + 1}', 'module': Tuned(weights[i])} for i in range(2)]
+        state, history = hotk.playgame(ai, board.copy(), adjudicate=True)  # the winner is known once it is decided
+        score += 1 if hotk.getwinner(state) == first else -1
+
+    return score
+
+
+def savejson(file, data):
+    '''Save data to a JSON file, replacing the file in one step (see hotk.replacefile).'''
+    with hotk.replacefile(file) as f:
+        json.dump(data, f, indent=1)
+
+
+def setdepth(depth):
+    '''Set the depth limit of amelia's search (in each worker process).'''
+    amelia.DLSmax = depth
+
+
+if __name__ == "__main__":
+    main(parser.parse_args())